@@ -1,4 +1,5 @@
 import asyncio
+from abc import ABC, abstractmethod
 from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect , Response, Request
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,19 +12,32 @@ from jose import JWTError, jwt
 from passlib.hash import argon2
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
-from bson import ObjectId
+from bson import ObjectId, json_util
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from pydantic import GetCoreSchemaHandler
 from pydantic_core import core_schema
 from fastapi.openapi.docs import get_swagger_ui_html
 import pytz
 import json
 import secrets
-from fastapi import Body
+from fastapi import Body, Query
 from fastapi import UploadFile, File
-from fastapi.responses import StreamingResponse
-import pandas as pd
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+from openpyxl import Workbook, load_workbook
+import numpy as np
 import random
-import io
+import base64
+import bisect
+import heapq
+import itertools
+import socket
+import csv
+import tempfile
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -40,10 +54,12 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30000
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # Time zone handling (Indian Standard Time)
+IST = pytz.timezone("Asia/Kolkata")
+
 def get_current_time():
-    ist = pytz.timezone("Asia/Kolkata")
-    now = datetime.now(ist)
-    return now.replace(tzinfo=None)
+    now = datetime.now(IST)
+    # MongoDB stores milliseconds, so truncate to keep in-memory documents identical to stored ones
+    return now.replace(tzinfo=None, microsecond=now.microsecond // 1000 * 1000)
 
 # Pydantic ObjectId for MongoDB
 class PyObjectId(str):
@@ -153,6 +169,13 @@ class MessageCreate(MessageBase):
     receiverId: Optional[PyObjectId] = None
     groupId: Optional[PyObjectId] = None
 
+class ReadReceipt(BaseModel):
+    """Mark a DM (peerId) or group (groupId) read up to a message id or a (timestamp, _id) cursor."""
+    peerId: Optional[PyObjectId] = None
+    groupId: Optional[PyObjectId] = None
+    upTo: Optional[PyObjectId] = None
+    cursor: Optional[str] = None
+
 class Message(MessageBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     senderId: PyObjectId
@@ -239,6 +262,98 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return argon2.hash(password)
 
+# Fire-and-forget tasks are kept referenced until they finish so they cannot be garbage-collected mid-flight
+_background_tasks = set()
+
+def spawn_background(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+# Password hashing worker pool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+class PasswordHasher:
+    """Runs argon2 hash/verify on a bounded thread pool so they never block the event loop.
+
+    argon2-cffi releases the GIL while hashing, so threads give real parallelism here.
+    Once more than workers + max_queue calls are pending, new requests are shed with a 503.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._bulk_slots = asyncio.Semaphore(workers)
+        self._pending = 0
+        self.completed = 0
+        self.shed = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self.queue_wait_seconds_total = 0.0
+        self.queue_wait_seconds_max = 0.0
+
+    async def _run(self, fn, *args, shed: bool = True):
+        if shed and self._pending >= self.workers + self.max_queue:
+            self.shed += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        submitted = time.perf_counter()
+
+        def timed_call():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        self._pending += 1
+        try:
+            result, queue_wait, took = await asyncio.get_running_loop().run_in_executor(self._executor, timed_call)
+        finally:
+            self._pending -= 1
+
+        self.completed += 1
+        self.hash_seconds_total += took
+        self.hash_seconds_max = max(self.hash_seconds_max, took)
+        self.queue_wait_seconds_total += queue_wait
+        self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+        return result
+
+    async def hash(self, password: str, shed: bool = True):
+        return await self._run(get_password_hash, password, shed=shed)
+
+    async def verify(self, plain_password: str, hashed_password: str, shed: bool = True):
+        return await self._run(verify_password, plain_password, hashed_password, shed=shed)
+
+    async def hash_many(self, passwords: List[str]):
+        """Hash a batch in parallel without letting it crowd out interactive logins."""
+        async def hash_one(password):
+            async with self._bulk_slots:
+                return await self._run(get_password_hash, password, shed=False)
+
+        return await asyncio.gather(*(hash_one(password) for password in passwords))
+
+    def stats(self):
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "shed": self.shed,
+            "hash_ms_avg": round(self.hash_seconds_total / completed * 1000, 2),
+            "hash_ms_max": round(self.hash_seconds_max * 1000, 2),
+            "queue_wait_ms_avg": round(self.queue_wait_seconds_total / completed * 1000, 2),
+            "queue_wait_ms_max": round(self.queue_wait_seconds_max * 1000, 2),
+        }
+
+password_hasher = PasswordHasher()
+
 def create_access_token(user: dict, expires_delta: timedelta):
     to_encode = {
         "name": user["name"],
@@ -250,6 +365,148 @@ def create_access_token(user: dict, expires_delta: timedelta):
     to_encode["exp"] = int(expire.timestamp())
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+# Opaque keyset cursors: the sort key values of the boundary document, base64-encoded
+def encode_cursor(values: list):
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+def decode_cursor(cursor: str, size: int):
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def keyset_filter(fields: List[str], values: list, direction: int):
+    """Range filter selecting documents strictly after `values` in (fields...) order."""
+    op = "$gt" if direction > 0 else "$lt"
+    clauses = []
+    for i, field in enumerate(fields):
+        clause = {fields[j]: values[j] for j in range(i)}
+        clause[field] = {op: values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+def keyset_upto(fields: List[str], values: list):
+    """Range filter selecting documents at or before `values` in (fields...) order."""
+    return {"$or": [keyset_filter(fields, values, -1), dict(zip(fields, values))]}
+
+# Tenant registry (collegeId -> database routing info cached in memory)
+TENANT_CACHE_TTL_SECONDS = int(os.getenv("TENANT_CACHE_TTL_SECONDS", "300"))
+
+class TenantRegistry:
+    """Caches the SaaS_Management.colleges fields needed to route a request to its tenant DB."""
+
+    def __init__(self, ttl_seconds: int = TENANT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, college_id: str):
+        entry = self._entries.get(college_id)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        college = await client["SaaS_Management"].colleges.find_one(
+            {"collegeId": college_id},
+            {"_id": 0, "collegeId": 1, "databaseName": 1, "status": 1, "collegeName": 1}
+        )
+        if not college:
+            self._entries.pop(college_id, None)
+            return None
+        self._entries[college_id] = (time.monotonic() + self.ttl_seconds, college)
+        return college
+
+    def invalidate(self, college_id: str):
+        self.invalidations += 1
+        self._entries.pop(college_id, None)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+tenant_registry = TenantRegistry()
+
+# Authenticated-principal cache (slim user documents keyed by collegeId, role, email)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+# Only the fields handlers read from current_user; the full profile is loaded on demand
+PRINCIPAL_PROJECTION = {
+    "_id": 1, "name": 1, "email": 1, "role": 1, "collegeId": 1,
+    "collegeStatus": 1, "department": 1, "permissions": 1,
+}
+
+class PrincipalCache:
+    """Bounded LRU/TTL cache of projected user documents used by get_current_user."""
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_SIZE, ttl_seconds: int = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._keys_by_id: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, college_id: str, role: str, email: str):
+        key = (college_id, role, email)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, college_id: str, role: str, email: str, principal: dict):
+        key = (college_id, role, email)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, principal)
+        self._entries.move_to_end(key)
+        self._keys_by_id[(college_id, str(principal["_id"]))] = key
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, college_id: str, role: str, email: str):
+        self._drop((college_id, role, email))
+
+    def invalidate_ids(self, college_id: str, user_ids):
+        for user_id in user_ids:
+            key = self._keys_by_id.get((college_id, str(user_id)))
+            if key:
+                self._drop(key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._keys_by_id.pop((key[0], str(entry[1]["_id"])), None)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+principal_cache = PrincipalCache()
+
 from fastapi import Request, Header, HTTPException, status
 
 async def verify_csrf(
@@ -291,19 +548,32 @@ async def get_current_user(token: str = Depends(get_token_from_cookie)):
         
         raise credentials_exception
 
-    # Fetch the college's database name from the global SaaS_Management database
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management.colleges.find_one({"collegeId": college_id})
+    # Resolve the college's database name through the tenant registry
+    college = await tenant_registry.get(college_id)
     if not college:
         raise HTTPException(status_code=404, detail="College not found")
 
     # Connect to the college's database
     college_db = client[college["databaseName"]]
-    user = await college_db[payload.get("role")].find_one({"email": token_data["email"]})
-    if user is None:
-        raise credentials_exception
+    role = payload.get("role")
+    principal = principal_cache.get(college_id, role, email)
+    if principal is None:
+        principal = await college_db[role].find_one({"email": token_data["email"]}, PRINCIPAL_PROJECTION)
+        if principal is None:
+            raise credentials_exception
+        principal_cache.put(college_id, role, email, principal)
+
+    # Handlers mutate current_user, so hand out a copy of the cached principal
+    user = dict(principal)
     user["collegeDb"] = college_db  # Attach the database to the user object for later use
-    del user["password"]
+    return user
+
+async def load_full_profile(current_user: dict):
+    """Fetch the complete user document for handlers that need more than the principal."""
+    college_db = current_user["collegeDb"]
+    user = await college_db[current_user["role"]].find_one({"_id": current_user["_id"]}, {"password": 0})
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
     return user
 
 async def get_current_superadmin(request: Request):
@@ -356,6 +626,7 @@ def custom_openapi():
         ("/users/", "get"),
         ("/messages/", "post"),
         ("/messages/", "get"),
+        ("/conversations", "get"),
         ("/groups/", "post"),
         ("/groups/", "get"),
         ("/admins/", "get"),
@@ -384,69 +655,963 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Rows-Per-Second", "X-Next-Cursor", "X-Prev-Cursor"],
 )
 
 
 
+# Group membership cache used for fan-out
+GROUP_CACHE_SIZE = int(os.getenv("GROUP_CACHE_SIZE", "2000"))
+
+class GroupMembershipIndex:
+    """LRU map of (college, group) -> set of member id strings, kept in sync by the group endpoints."""
+
+    def __init__(self, max_size: int = GROUP_CACHE_SIZE):
+        self.max_size = max_size
+        self._groups: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, college_db, college_id: str, group_id: str):
+        """Member ids of a group, or None if the group does not exist."""
+        key = (college_id, str(group_id))
+        members = self._groups.get(key)
+        if members is not None:
+            self._groups.move_to_end(key)
+            self.hits += 1
+            return members
+
+        self.misses += 1
+        if not ObjectId.is_valid(str(group_id)):
+            return None
+        group = await college_db.groups.find_one({"_id": ObjectId(group_id)}, {"members": 1})
+        if not group:
+            return None
+        return self.put(college_id, group_id, group.get("members", []))
+
+    def put(self, college_id: str, group_id, member_ids):
+        key = (college_id, str(group_id))
+        members = {str(member_id) for member_id in member_ids}
+        self._groups[key] = members
+        self._groups.move_to_end(key)
+        while len(self._groups) > self.max_size:
+            self._groups.popitem(last=False)
+            self.evictions += 1
+        return members
+
+    def add_member(self, college_id: str, group_id, member_id):
+        # Only patch groups that are cached; a miss reloads the full list anyway
+        members = self._groups.get((college_id, str(group_id)))
+        if members is not None:
+            members.add(str(member_id))
+
+    def stats(self):
+        return {
+            "size": len(self._groups),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+group_members = GroupMembershipIndex()
+
+# User id -> role routing (which of Student/Alumni/Admin holds a user)
+USER_ROLES = ["Student", "Alumni", "Admin"]
+USER_ROLE_CACHE_SIZE = int(os.getenv("USER_ROLE_CACHE_SIZE", "50000"))
+
+class UserRoleIndex:
+    """
+    Routes a user id straight to its role collection.
+
+    Backed by the tenant's user_roles collection, which every insert and delete path keeps
+    current, with an LRU in front. Ids registered before the index existed are found with a
+    one-off lookup across the role collections and backfilled.
+    """
+
+    def __init__(self, max_size: int = USER_ROLE_CACHE_SIZE):
+        self.max_size = max_size
+        self._roles: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.backfills = 0
+
+    def _remember(self, college_id: str, user_id: str, role: str):
+        key = (college_id, user_id)
+        self._roles[key] = role
+        self._roles.move_to_end(key)
+        while len(self._roles) > self.max_size:
+            self._roles.popitem(last=False)
+
+    async def roles_of(self, college_db, college_id: str, user_ids: List[str]):
+        """{userId: role} for the ids that exist; unknown ids are left out."""
+        found = {}
+        missing = []
+        for user_id in user_ids:
+            role = self._roles.get((college_id, user_id))
+            if role:
+                self._roles.move_to_end((college_id, user_id))
+                found[user_id] = role
+            elif ObjectId.is_valid(user_id):
+                missing.append(user_id)
+        self.hits += len(found)
+        if not missing:
+            return found
+        self.misses += len(missing)
+
+        async for entry in college_db["user_roles"].find({"_id": {"$in": [ObjectId(user_id) for user_id in missing]}}):
+            found[str(entry["_id"])] = entry["role"]
+            self._remember(college_id, str(entry["_id"]), entry["role"])
+
+        legacy = [ObjectId(user_id) for user_id in missing if user_id not in found]
+        if legacy:
+            results = await asyncio.gather(*(
+                college_db[role].find({"_id": {"$in": legacy}}, {"_id": 1}).to_list(length=len(legacy))
+                for role in USER_ROLES
+            ))
+            backfill = {}
+            for role, users in zip(USER_ROLES, results):
+                for user in users:
+                    backfill.setdefault(role, []).append(user["_id"])
+                    found[str(user["_id"])] = role
+            for role, ids in backfill.items():
+                self.backfills += len(ids)
+                await self.add(college_db, college_id, ids, role)
+        return found
+
+    async def role_of(self, college_db, college_id: str, user_id: str):
+        return (await self.roles_of(college_db, college_id, [str(user_id)])).get(str(user_id))
+
+    async def find_user(self, college_db, college_id: str, user_id: str, projection: Optional[dict] = None):
+        """(role, document) for a user id with a single find_one, or (None, None)."""
+        role = await self.role_of(college_db, college_id, user_id)
+        if not role:
+            return None, None
+        user = await college_db[role].find_one({"_id": ObjectId(user_id)}, projection)
+        if not user:
+            # Stale entry (removed outside the maintained paths)
+            await self.remove(college_db, college_id, [user_id])
+            return None, None
+        return role, user
+
+    async def add(self, college_db, college_id: str, user_ids: list, role: str):
+        if not user_ids:
+            return
+        await college_db["user_roles"].bulk_write([
+            UpdateOne({"_id": ObjectId(str(user_id))}, {"$set": {"role": role}}, upsert=True)
+            for user_id in user_ids
+        ], ordered=False)
+        for user_id in user_ids:
+            self._remember(college_id, str(user_id), role)
+
+    async def remove(self, college_db, college_id: str, user_ids: list):
+        if not user_ids:
+            return
+        await college_db["user_roles"].delete_many({"_id": {"$in": [ObjectId(str(user_id)) for user_id in user_ids]}})
+        for user_id in user_ids:
+            self._roles.pop((college_id, str(user_id)), None)
+
+    def stats(self):
+        return {
+            "size": len(self._roles),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "backfills": self.backfills,
+        }
+
+user_roles = UserRoleIndex()
+
 # WebSocket Manager
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")  # drop_oldest | coalesce | disconnect
+WS_PING_INTERVAL_SECONDS = float(os.getenv("WS_PING_INTERVAL_SECONDS", "25"))
+WS_PONG_TIMEOUT_SECONDS = float(os.getenv("WS_PONG_TIMEOUT_SECONDS", "10"))
+WS_IDLE_TIMEOUT_SECONDS = WS_PING_INTERVAL_SECONDS + WS_PONG_TIMEOUT_SECONDS
+WS_MAX_CONNECTIONS_PER_USER = int(os.getenv("WS_MAX_CONNECTIONS_PER_USER", "10"))
+WS_MAX_CONNECTIONS_PER_COLLEGE = int(os.getenv("WS_MAX_CONNECTIONS_PER_COLLEGE", "10000"))
+PING_FRAME = json.dumps({"type": "ping"})
+PONG_FRAME = json.dumps({"type": "pong"})
+
+class ClientConnection:
+    """
+    A WebSocket with its own bounded outbound queue drained by a writer task.
+
+    Fan-out only appends to the queue, so a slow client delays nobody but itself. When the
+    queue is full the overflow policy decides: drop the oldest frame, replace a queued frame
+    with the same coalesce key (e.g. presence updates), or disconnect the client.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: str, college_id: str,
+                 max_queue: int = WS_SEND_QUEUE_SIZE, policy: str = WS_OVERFLOW_POLICY):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.college_id = college_id
+        self.max_queue = max_queue
+        self.policy = policy
+        self.queue: deque = deque()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, text: str, coalesce_key: Optional[str] = None):
+        if self.closed:
+            return False
+        if len(self.queue) >= self.max_queue and not self._make_room(coalesce_key, text):
+            return False
+        self.queue.append((time.monotonic(), text, coalesce_key))
+        self._wakeup.set()
+        return True
+
+    def _make_room(self, coalesce_key: Optional[str], text: str):
+        """Apply the overflow policy; returns False if the new frame should not be queued."""
+        if self.policy == "disconnect":
+            self.dropped += 1
+            self.close(code=1013, reason="Send queue overflow")
+            return False
+        if self.policy == "coalesce":
+            for index, (enqueued_at, _, key) in enumerate(self.queue):
+                if coalesce_key is not None and key == coalesce_key:
+                    # Keep the slot (and its age) but deliver the newest state
+                    self.queue[index] = (enqueued_at, text, coalesce_key)
+                    self.dropped += 1
+                    return False
+            for index, (_, _, key) in enumerate(self.queue):
+                if key is not None:
+                    del self.queue[index]
+                    self.dropped += 1
+                    return True
+        self.queue.popleft()
+        self.dropped += 1
+        return True
+
+    async def _write_loop(self):
+        try:
+            while True:
+                while not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                enqueued_at, text, _ = self.queue.popleft()
+                await self.websocket.send_text(text)
+                self.sent += 1
+                self.last_lag = time.monotonic() - enqueued_at
+                self.max_lag = max(self.max_lag, self.last_lag)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error sending to {self.college_id}:{self.user_id}: {e}")
+            self.close(code=1011)
+
+    def touch(self):
+        """Record inbound traffic; any frame from the client counts as a heartbeat."""
+        self.last_seen = time.monotonic()
+
+    def idle_for(self):
+        return time.monotonic() - self.last_seen
+
+    def lag(self):
+        """Age of the oldest undelivered frame, or the last delivery lag when idle."""
+        if self.queue:
+            return time.monotonic() - self.queue[0][0]
+        return self.last_lag
+
+    def close(self, code: int = 1000, reason: Optional[str] = None):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        manager.discard(self)
+        if self.websocket.client_state == WebSocketState.CONNECTED:
+            asyncio.create_task(self._close_socket(code, reason))
+
+    async def _close_socket(self, code: int, reason: Optional[str]):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+# Cross-worker delivery backplane
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"
+BACKPLANE_URL = os.getenv("BACKPLANE_URL", "")  # empty = in-process loopback, redis://... = Redis pub/sub
+BACKPLANE_QUEUE_SIZE = int(os.getenv("BACKPLANE_QUEUE_SIZE", "10000"))
+BACKPLANE_WORKER_TTL_SECONDS = int(os.getenv("BACKPLANE_WORKER_TTL_SECONDS", "30"))
+
+class Backplane(ABC):
+    """
+    Carries WebSocket deliveries between API workers and tracks which worker holds whose sockets.
+
+    Envelopes are JSON-serializable dicts. publish() with a worker_id targets one worker,
+    without one it reaches every other worker.
+    """
+
+    async def start(self, worker_id: str, on_envelope):
+        self.worker_id = worker_id
+        self.on_envelope = on_envelope
+
+    async def stop(self):
+        pass
+
+    def has_peers(self):
+        return True
+
+    @abstractmethod
+    async def publish(self, envelope: dict, worker_id: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    async def register(self, college_id: str, user_id: str):
+        ...
+
+    @abstractmethod
+    async def unregister(self, college_id: str, user_id: str):
+        ...
+
+    @abstractmethod
+    async def workers_for(self, college_id: str, user_ids: List[str]):
+        """Map each user id to the set of workers currently holding a socket for them."""
+
+class LoopbackHub:
+    """Shared state for LoopbackBackplanes living in the same process (single worker or tests)."""
+
+    def __init__(self):
+        self.workers: dict = {}
+        self.presence: dict = {}
+
+class LoopbackBackplane(Backplane):
+    def __init__(self, hub: Optional[LoopbackHub] = None):
+        self.hub = hub or LoopbackHub()
+
+    async def start(self, worker_id: str, on_envelope):
+        await super().start(worker_id, on_envelope)
+        self.hub.workers[worker_id] = self
+
+    async def stop(self):
+        self.hub.workers.pop(self.worker_id, None)
+        for workers in self.hub.presence.values():
+            workers.discard(self.worker_id)
+
+    def has_peers(self):
+        return len(self.hub.workers) > 1
+
+    async def publish(self, envelope: dict, worker_id: Optional[str] = None):
+        targets = [worker_id] if worker_id else [w for w in self.hub.workers if w != self.worker_id]
+        for target in targets:
+            backplane = self.hub.workers.get(target)
+            if backplane:
+                # Round-trip through JSON so loopback behaves like a real transport
+                spawn_background(backplane.on_envelope(json.loads(json.dumps(envelope))))
+
+    async def register(self, college_id: str, user_id: str):
+        self.hub.presence.setdefault((college_id, user_id), set()).add(self.worker_id)
+
+    async def unregister(self, college_id: str, user_id: str):
+        workers = self.hub.presence.get((college_id, user_id))
+        if workers:
+            workers.discard(self.worker_id)
+            if not workers:
+                del self.hub.presence[(college_id, user_id)]
+
+    async def workers_for(self, college_id: str, user_ids: List[str]):
+        return {user_id: set(self.hub.presence.get((college_id, user_id), ())) for user_id in user_ids}
+
+class RedisBackplane(Backplane):
+    """Redis pub/sub transport with presence sets; dead workers age out via a heartbeat key."""
+
+    BROADCAST_CHANNEL = "ws:broadcast"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # only needed when BACKPLANE_URL points at Redis
+        self.redis = redis.from_url(url, decode_responses=True)
+        self._tasks = []
+
+    async def start(self, worker_id: str, on_envelope):
+        await super().start(worker_id, on_envelope)
+        self.pubsub = self.redis.pubsub()
+        await self.pubsub.subscribe(self.BROADCAST_CHANNEL, f"ws:worker:{worker_id}")
+        await self._heartbeat_once()
+        self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._heartbeat())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await self.redis.delete(f"ws:alive:{self.worker_id}")
+        await self.pubsub.aclose()
+        await self.redis.aclose()
+
+    async def _listen(self):
+        async for item in self.pubsub.listen():
+            if item.get("type") != "message":
+                continue
+            try:
+                envelope = json.loads(item["data"])
+                if envelope.get("origin") != self.worker_id:
+                    await self.on_envelope(envelope)
+            except Exception as e:
+                print(f"Backplane delivery error: {e}")
+
+    async def _heartbeat_once(self):
+        await self.redis.set(f"ws:alive:{self.worker_id}", "1", ex=BACKPLANE_WORKER_TTL_SECONDS)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(BACKPLANE_WORKER_TTL_SECONDS / 3)
+            try:
+                await self._heartbeat_once()
+            except Exception as e:
+                print(f"Backplane heartbeat error: {e}")
+
+    async def publish(self, envelope: dict, worker_id: Optional[str] = None):
+        channel = f"ws:worker:{worker_id}" if worker_id else self.BROADCAST_CHANNEL
+        await self.redis.publish(channel, json.dumps({**envelope, "origin": self.worker_id}))
+
+    async def register(self, college_id: str, user_id: str):
+        await self.redis.sadd(f"ws:presence:{college_id}:{user_id}", self.worker_id)
+
+    async def unregister(self, college_id: str, user_id: str):
+        await self.redis.srem(f"ws:presence:{college_id}:{user_id}", self.worker_id)
+
+    async def workers_for(self, college_id: str, user_ids: List[str]):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.smembers(f"ws:presence:{college_id}:{user_id}")
+            memberships = await pipe.execute()
+        workers = set().union(*memberships) if memberships else set()
+        alive = set()
+        if workers:
+            ordered = list(workers)
+            flags = await self.redis.mget([f"ws:alive:{worker}" for worker in ordered])
+            alive = {worker for worker, flag in zip(ordered, flags) if flag}
+        return {user_id: set(members) & alive for user_id, members in zip(user_ids, memberships)}
+
+def make_backplane():
+    if BACKPLANE_URL.startswith(("redis://", "rediss://")):
+        return RedisBackplane(BACKPLANE_URL)
+    return LoopbackBackplane()
+
 class ConnectionManager:
+    """
+    Live sockets indexed college -> user -> set of connections.
+
+    A user may hold several connections (tabs, devices); college-wide operations only
+    touch that college's online users.
+    """
+
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+        self.colleges: Dict[str, Dict[str, set]] = {}
+        self.backplane: Optional[Backplane] = None
+        self._outbound: Optional[asyncio.Queue] = None
+        self._presence: Optional[asyncio.Queue] = None
+        self._pump = None
+        self._presence_pump = None
+        self.forwarded = 0
+        self.received = 0
+        self.forward_dropped = 0
+        self.college_counts: Dict[str, int] = {}
+        self.reaped = 0
+        self.rejected = 0
+        self.evicted = 0
+        self._heartbeat = None
+
+    async def start_backplane(self, backplane: Backplane, worker_id: str = WORKER_ID):
+        self.backplane = backplane
+        self._outbound = asyncio.Queue(maxsize=BACKPLANE_QUEUE_SIZE)
+        # Unbounded: a lost register would leave the user unreachable from other workers
+        self._presence = asyncio.Queue()
+        await backplane.start(worker_id, self._deliver_remote)
+        self._pump = asyncio.create_task(self._pump_outbound())
+        self._presence_pump = asyncio.create_task(self._pump_presence())
+
+    async def stop_backplane(self):
+        for pump in (self._pump, self._presence_pump):
+            if pump:
+                pump.cancel()
+        if self.backplane:
+            await self.backplane.stop()
+
+    def _forward(self, envelope: dict):
+        """Queue an envelope for other workers without ever blocking the sender."""
+        if self._outbound is None:
+            return
+        if envelope["kind"] == "presence":
+            self._presence.put_nowait(envelope)
+            return
+        if not self.backplane.has_peers():
+            return
+        try:
+            self._outbound.put_nowait(envelope)
+        except asyncio.QueueFull:
+            self.forward_dropped += 1
+
+    async def _pump_outbound(self):
+        while True:
+            envelope = await self._outbound.get()
+            try:
+                if envelope["kind"] == "user":
+                    # Route straight to the workers holding the recipients' sockets
+                    located = await self.backplane.workers_for(envelope["collegeId"], envelope["userIds"])
+                    by_worker: dict = {}
+                    for user_id, workers in located.items():
+                        for worker in workers - {self.backplane.worker_id}:
+                            by_worker.setdefault(worker, []).append(user_id)
+                    for worker, user_ids in by_worker.items():
+                        await self.backplane.publish({**envelope, "userIds": user_ids}, worker)
+                        self.forwarded += 1
+                else:
+                    await self.backplane.publish(envelope)
+                    self.forwarded += 1
+            except Exception as e:
+                print(f"Backplane publish error: {e}")
+
+    async def _pump_presence(self):
+        """Apply presence changes in order, retrying until the backplane accepts each one."""
+        while True:
+            envelope = await self._presence.get()
+            while True:
+                try:
+                    if envelope["online"]:
+                        await self.backplane.register(envelope["collegeId"], envelope["userId"])
+                    else:
+                        await self.backplane.unregister(envelope["collegeId"], envelope["userId"])
+                    break
+                except Exception as e:
+                    print(f"Backplane presence error, retrying: {e}")
+                    await asyncio.sleep(1)
+
+    async def _deliver_remote(self, envelope: dict):
+        """Deliver an envelope published by another worker to sockets held here."""
+        self.received += 1
+        kind = envelope["kind"]
+        college_id = envelope["collegeId"]
+        if kind == "user":
+            for user_id in envelope["userIds"]:
+                self._deliver_user(envelope["message"], user_id, college_id, envelope.get("coalesceKey"))
+        elif kind == "college":
+            self._deliver_college(envelope["message"], college_id, envelope.get("exclude"), envelope.get("coalesceKey"))
+        elif kind == "group":
+            await self._deliver_group(
+                envelope["message"], envelope["groupId"], college_id,
+                client[envelope["databaseName"]], envelope.get("exclude")
+            )
+        elif kind == "group_member":
+            group_members.add_member(college_id, envelope["groupId"], envelope["memberId"])
+
+    async def is_online_anywhere(self, college_id: str, user_id: str):
+        if self.is_online(college_id, user_id):
+            return True
+        if self.backplane is None or not self.backplane.has_peers():
+            return False
+        located = await self.backplane.workers_for(college_id, [user_id])
+        # This worker has no local socket; its own unregister may simply not have been applied yet
+        return bool(located.get(user_id, set()) - {self.backplane.worker_id})
+
+    def group_member_added(self, college_id: str, group_id: str, member_id: str):
+        group_members.add_member(college_id, group_id, member_id)
+        self._forward({"kind": "group_member", "collegeId": college_id, "groupId": str(group_id), "memberId": str(member_id)})
+
+    def start_heartbeat(self):
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    def stop_heartbeat(self):
+        if self._heartbeat:
+            self._heartbeat.cancel()
+
+    async def _heartbeat_loop(self):
+        """
+        Ping connections that have been quiet for about an interval so live clients answer with a pong.
+
+        Ticking at a quarter interval means a quiet connection is pinged by the time it has been
+        idle WS_PING_INTERVAL_SECONDS, leaving the full pong timeout before the receive deadline.
+        """
+        tick = WS_PING_INTERVAL_SECONDS / 4
+        while True:
+            await asyncio.sleep(tick)
+            for connection in self.all_connections():
+                if connection.idle_for() >= WS_PING_INTERVAL_SECONDS - tick:
+                    connection.enqueue(PING_FRAME, coalesce_key="ping")
 
     async def connect(self, websocket: WebSocket, user_id: str, college_id: str):
-        key = f"{college_id}:{user_id}"
         try:
+            if self.college_counts.get(college_id, 0) >= WS_MAX_CONNECTIONS_PER_COLLEGE:
+                self.rejected += 1
+                await websocket.close(code=1013, reason="Too many connections for this college")
+                return None
             if websocket.client_state == WebSocketState.CONNECTING:  # Ensure WebSocket is still connecting
                 await websocket.accept()
-            self.active_connections[key] = websocket
+            existing = self.user_connections(college_id, user_id)
+            if len(existing) >= WS_MAX_CONNECTIONS_PER_USER:
+                # The newest tab wins; the oldest socket is the likeliest to be stale
+                oldest = min(existing, key=lambda c: c.connected_at)
+                self.evicted += 1
+                oldest.close(code=1008, reason="Too many connections for this user")
+            connection = ClientConnection(websocket, user_id, college_id)
+            users = self.colleges.setdefault(college_id, {})
+            if user_id not in users:
+                self._forward({"kind": "presence", "collegeId": college_id, "userId": user_id, "online": True})
+            users.setdefault(user_id, set()).add(connection)
+            self.college_counts[college_id] = self.college_counts.get(college_id, 0) + 1
+            return connection
         except Exception as e:
             print(f"WebSocket connection error: {e}")
-        
 
     def disconnect(self, user_id: str, college_id: str):
-        key = f"{college_id}:{user_id}"
-        if key in self.active_connections:
-            del self.active_connections[key]
+        """Close every connection the user holds."""
+        for connection in list(self.user_connections(college_id, user_id)):
+            connection.close()
 
-    async def send_personal_message(self, message: str, user_id: str, college_id: str):
-        key = f"{college_id}:{user_id}"
-        if key in self.active_connections:
-            await self.active_connections[key].send_text(message)
+    def discard(self, connection: ClientConnection):
+        users = self.colleges.get(connection.college_id)
+        if not users:
+            return
+        connections = users.get(connection.user_id)
+        if not connections or connection not in connections:
+            return
+        connections.discard(connection)
+        remaining = self.college_counts.get(connection.college_id, 1) - 1
+        if remaining > 0:
+            self.college_counts[connection.college_id] = remaining
+        else:
+            self.college_counts.pop(connection.college_id, None)
+        if not connections:
+            del users[connection.user_id]
+            self._forward({"kind": "presence", "collegeId": connection.college_id, "userId": connection.user_id, "online": False})
+            if not users:
+                del self.colleges[connection.college_id]
+
+    def user_connections(self, college_id: str, user_id: str):
+        return self.colleges.get(college_id, {}).get(user_id, ())
+
+    def is_online(self, college_id: str, user_id: str):
+        return bool(self.user_connections(college_id, user_id))
+
+    def online_users(self, college_id: str):
+        return self.colleges.get(college_id, {})
+
+    def all_connections(self):
+        return [
+            connection
+            for users in self.colleges.values()
+            for connections in users.values()
+            for connection in connections
+        ]
+
+    async def send_personal_message(self, message: str, user_id: str, college_id: str, coalesce_key: Optional[str] = None):
+        self._deliver_user(message, user_id, college_id, coalesce_key)
+        self._forward({"kind": "user", "collegeId": college_id, "userIds": [user_id], "message": message, "coalesceKey": coalesce_key})
+
+    async def broadcast_to_college(self, message: str, college_id: str, exclude_user_id: str = None, coalesce_key: Optional[str] = None):
+        self._deliver_college(message, college_id, exclude_user_id, coalesce_key)
+        self._forward({"kind": "college", "collegeId": college_id, "exclude": exclude_user_id, "message": message, "coalesceKey": coalesce_key})
 
     async def broadcast_to_group(self, message: str, group_id: str, college_id: str, college_db, exclude_user_id: str = None):
         if not group_id:
             # If no group_id is provided, broadcast to all users in the college
-            for key in self.active_connections:
-                if key.startswith(f"{college_id}:") and not key.endswith(f":{exclude_user_id}"):
-                    try:
-                        await self.active_connections[key].send_text(message)
-                    except Exception as e:
-                        print(f"Error broadcasting to {key}: {e}")
+            await self.broadcast_to_college(message, college_id, exclude_user_id)
             return
-            
-        group = await college_db.groups.find_one({"_id": ObjectId(group_id)})
-        if not group:
+
+        await self._deliver_group(message, group_id, college_id, college_db, exclude_user_id)
+        self._forward({
+            "kind": "group", "collegeId": college_id, "databaseName": college_db.name,
+            "groupId": str(group_id), "exclude": exclude_user_id, "message": message
+        })
+
+    def _deliver_user(self, message: str, user_id: str, college_id: str, coalesce_key: Optional[str] = None):
+        for connection in list(self.user_connections(college_id, user_id)):
+            connection.enqueue(message, coalesce_key)
+
+    def _deliver_college(self, message: str, college_id: str, exclude_user_id: str = None, coalesce_key: Optional[str] = None):
+        for user_id, connections in list(self.online_users(college_id).items()):
+            if user_id == exclude_user_id:
+                continue
+            for connection in list(connections):
+                connection.enqueue(message, coalesce_key)
+
+    async def _deliver_group(self, message: str, group_id: str, college_id: str, college_db, exclude_user_id: str = None):
+        online = self.online_users(college_id)
+        if not online:
+            return
+        members = await group_members.get(college_db, college_id, group_id)
+        if members is None:
             print(f"Group {group_id} not found")
             return
-    
-        members = group["members"]
-        print(f"Broadcasting to group {group_id} with members {members}")
-        for member_id in members:
-            member_id_str = str(member_id)
+
+        # Visit whichever side is smaller: the group's members or the college's online users
+        if len(members) <= len(online):
+            online_members = [m for m in members if m in online]
+        else:
+            online_members = [user_id for user_id in online if user_id in members]
+
+        for member_id_str in online_members:
             if member_id_str == exclude_user_id:
                 continue  # Skip the sender
-            key = f"{college_id}:{member_id_str}"
-            if key in self.active_connections:
-                try:
-                    await self.active_connections[key].send_text(message)
-                    print(f"Sent group message to {member_id_str}: {message}")
-                except Exception as e:
-                    print(f"Error sending to {member_id_str}: {e}")
-            else:
-                print(f"Member {member_id_str} not connected in college {college_id}")
+            for connection in list(online.get(member_id_str, ())):
+                connection.enqueue(message)
+
+    def stats(self, top: int = 50):
+        connections = self.all_connections()
+        laggiest = sorted(connections, key=lambda c: c.lag(), reverse=True)[:top]
+        idle = sum(1 for c in connections if c.idle_for() >= WS_PING_INTERVAL_SECONDS)
+        return {
+            "connections": len(connections),
+            "live": len(connections) - idle,
+            "idle": idle,
+            "reaped": self.reaped,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+            "colleges": len(self.colleges),
+            "online_users": sum(len(users) for users in self.colleges.values()),
+            "worker_id": self.backplane.worker_id if self.backplane else None,
+            "backplane": type(self.backplane).__name__ if self.backplane else None,
+            "backplane_queue": self._outbound.qsize() if self._outbound else 0,
+            "backplane_presence_queue": self._presence.qsize() if self._presence else 0,
+            "backplane_forwarded": self.forwarded,
+            "backplane_received": self.received,
+            "backplane_dropped": self.forward_dropped,
+            "overflow_policy": WS_OVERFLOW_POLICY,
+            "queued_frames": sum(len(c.queue) for c in connections),
+            "dropped_frames": sum(c.dropped for c in connections),
+            "max_lag_ms": round(max((c.lag() for c in connections), default=0) * 1000, 2),
+            "laggiest_connections": [
+                {
+                    "collegeId": c.college_id,
+                    "userId": c.user_id,
+                    "queued": len(c.queue),
+                    "lag_ms": round(c.lag() * 1000, 2),
+                    "max_lag_ms": round(c.max_lag * 1000, 2),
+                    "sent": c.sent,
+                    "dropped": c.dropped,
+                }
+                for c in laggiest
+            ],
+        }
 
 manager = ConnectionManager()
 
+@app.on_event("startup")
+async def start_backplane():
+    await manager.start_backplane(make_backplane())
+
+@app.on_event("shutdown")
+async def stop_backplane():
+    await manager.stop_backplane()
+
+@app.on_event("startup")
+async def start_websocket_heartbeat():
+    manager.start_heartbeat()
+
+@app.on_event("shutdown")
+async def stop_websocket_heartbeat():
+    manager.stop_heartbeat()
+
+# Presence: online state derived from the connection manager, lastSeen/status persisted in batches
+PRESENCE_FLUSH_INTERVAL_SECONDS = float(os.getenv("PRESENCE_FLUSH_INTERVAL_SECONDS", "5"))
+PRESENCE_OFFLINE_GRACE_SECONDS = float(os.getenv("PRESENCE_OFFLINE_GRACE_SECONDS", "10"))
+
+class PresenceRegistry:
+    """
+    In-memory lastSeen/status per (collegeId, userId).
+
+    Writes are coalesced per user and flushed with one bulk_write per tenant and role every
+    PRESENCE_FLUSH_INTERVAL_SECONDS. Going offline waits PRESENCE_OFFLINE_GRACE_SECONDS so a
+    reconnect (on any worker) within the grace period never produces an offline/online pair.
+    """
+
+    def __init__(self, flush_interval: float = PRESENCE_FLUSH_INTERVAL_SECONDS, grace: float = PRESENCE_OFFLINE_GRACE_SECONDS):
+        self.flush_interval = flush_interval
+        self.grace = grace
+        self._seen: dict = {}
+        self._dirty: dict = {}
+        self._pending_offline: dict = {}
+        self._flusher = None
+        self.flushes = 0
+        self.writes = 0
+        self.failed = 0
+        self.suppressed = 0
+        self.transitions = 0
+
+    def start(self):
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+        await self.flush()
+
+    def seen(self, college_id: str, user_id: str, role: Optional[str], status: Optional[str] = None):
+        """Record activity; the database write is deferred to the next flush."""
+        if role not in USER_ROLES or not ObjectId.is_valid(user_id):
+            return
+        key = (college_id, user_id)
+        now = get_current_time()
+        self._seen[key] = now
+        update = self._dirty.setdefault(key, {"role": role})
+        update["lastSeen"] = now
+        if status:
+            update["status"] = status
+
+    def connected(self, college_id: str, user_id: str, role: Optional[str]):
+        key = (college_id, user_id)
+        pending = self._pending_offline.pop(key, None)
+        self.seen(college_id, user_id, role, status="online")
+        if pending:
+            # Reconnected within the grace period: nobody was told they left
+            pending.cancel()
+            self.suppressed += 1
+            return False
+        return len(manager.user_connections(college_id, user_id)) == 1
+
+    def disconnected(self, college_id: str, user_id: str, role: Optional[str]):
+        key = (college_id, user_id)
+        self.seen(college_id, user_id, role)
+        if manager.is_online(college_id, user_id) or key in self._pending_offline:
+            return
+        self._pending_offline[key] = asyncio.create_task(self._offline_after_grace(college_id, user_id, role))
+
+    async def _offline_after_grace(self, college_id: str, user_id: str, role: Optional[str]):
+        key = (college_id, user_id)
+        try:
+            await asyncio.sleep(self.grace)
+        finally:
+            if self._pending_offline.get(key) is asyncio.current_task():
+                del self._pending_offline[key]
+        if await manager.is_online_anywhere(college_id, user_id):
+            self.suppressed += 1
+            return
+        self.seen(college_id, user_id, role, status="offline")
+        self.transitions += 1
+        await manager.broadcast_to_college(
+            json.dumps({"type": "user_offline", "userId": user_id}),
+            college_id,
+            exclude_user_id=user_id,
+            coalesce_key=f"presence:{user_id}"
+        )
+
+    async def announce_online(self, college_id: str, user_id: str):
+        self.transitions += 1
+        await manager.broadcast_to_college(
+            json.dumps({"type": "user_online", "userId": user_id}),
+            college_id,
+            exclude_user_id=user_id,
+            coalesce_key=f"presence:{user_id}"
+        )
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Presence flush failed: {e}")
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        batches: dict = {}
+        for (college_id, user_id), update in dirty.items():
+            batches.setdefault((college_id, update["role"]), []).append((user_id, update))
+        for (college_id, role), entries in batches.items():
+            updates = [
+                UpdateOne({"_id": ObjectId(user_id)}, {"$set": {field: value for field, value in update.items() if field != "role"}})
+                for user_id, update in entries
+            ]
+            try:
+                college = await tenant_registry.get(college_id)
+                if college:
+                    await client[college["databaseName"]][role].bulk_write(updates, ordered=False)
+                    self.writes += len(updates)
+            except Exception as e:
+                print(f"Presence flush of {len(updates)} {role} updates for {college_id} failed: {e}")
+                self.failed += 1
+                self._requeue(college_id, entries)
+                continue
+            self._forget_offline(college_id, entries)
+        self.flushes += 1
+
+    def _forget_offline(self, college_id: str, entries: list):
+        """Stop tracking users that went offline once their lastSeen is stored; lookup reads it from Mongo."""
+        for user_id, update in entries:
+            key = (college_id, user_id)
+            if key in self._dirty or key in self._pending_offline or manager.is_online(college_id, user_id):
+                continue
+            if self._seen.get(key) == update["lastSeen"]:
+                del self._seen[key]
+
+    def _requeue(self, college_id: str, entries: list):
+        """Put a batch that failed to write back for the next flush; anything recorded since wins."""
+        for user_id, update in entries:
+            key = (college_id, user_id)
+            self._dirty[key] = {**update, **self._dirty.get(key, {})}
+
+    async def lookup(self, college_db, college_id: str, user_ids: List[str]):
+        """{userId: {"status", "lastSeen"}} from live connections, the backplane and, for the rest, the database."""
+        online = {user_id for user_id in user_ids if manager.is_online(college_id, user_id)}
+        remote = [user_id for user_id in user_ids if user_id not in online]
+        if remote and manager.backplane and manager.backplane.has_peers():
+            located = await manager.backplane.workers_for(college_id, remote)
+            online.update(user_id for user_id, workers in located.items() if workers)
+
+        last_seen = {user_id: self._seen[(college_id, user_id)] for user_id in user_ids if (college_id, user_id) in self._seen}
+        missing = [user_id for user_id in user_ids if user_id not in last_seen]
+        if missing:
+            by_role: dict = {}
+            for user_id, role in (await user_roles.roles_of(college_db, college_id, missing)).items():
+                by_role.setdefault(role, []).append(ObjectId(user_id))
+            found = await asyncio.gather(*(
+                college_db[role].find({"_id": {"$in": ids}}, {"lastSeen": 1}).to_list(length=len(ids))
+                for role, ids in by_role.items()
+            ))
+            for user in (user for users in found for user in users):
+                last_seen[str(user["_id"])] = user.get("lastSeen")
+
+        return {
+            user_id: {
+                "status": "online" if user_id in online else "offline",
+                "lastSeen": last_seen.get(user_id)
+            }
+            for user_id in user_ids
+        }
+
+    def stats(self):
+        return {
+            "tracked_users": len(self._seen),
+            "pending_offline": len(self._pending_offline),
+            "dirty": len(self._dirty),
+            "flushes": self.flushes,
+            "writes": self.writes,
+            "failed_flushes": self.failed,
+            "transitions": self.transitions,
+            "suppressed_flaps": self.suppressed,
+        }
+
+presence = PresenceRegistry()
+
+@app.on_event("startup")
+async def start_presence():
+    presence.start()
+
+@app.on_event("shutdown")
+async def stop_presence():
+    await presence.stop()
+
+@app.get("/presence")
+async def get_presence(ids: str, current_user: dict = Depends(get_current_user)):
+    """Batch presence for a comma-separated list of user ids in the caller's college."""
+    user_ids = list(dict.fromkeys(user_id.strip() for user_id in ids.split(",") if user_id.strip()))
+    if not user_ids or len(user_ids) > 500:
+        raise HTTPException(status_code=400, detail="Provide between 1 and 500 ids")
+    if not all(ObjectId.is_valid(user_id) for user_id in user_ids):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+    return await presence.lookup(current_user["collegeDb"], current_user["collegeId"], user_ids)
+
 async def initialize_college_meta(college_db):
     """Initialize the meta collection for a new college"""
     meta = CollegeMeta().dict()
@@ -473,10 +1638,6 @@ async def create_college(request: CollegeRegistrationRequest):
     college_dict["status"] = "pending"
     # Do NOT store password in college_dict
 
-    await SaaS_Management.colleges.insert_one(college_dict)
-
-    # Create the admin user in the college's database using college details
-    college_db = client[database_name]
     admin_obj = AdminCreate(
         name=college.collegeId,
         email=college.email,
@@ -485,8 +1646,16 @@ async def create_college(request: CollegeRegistrationRequest):
         password=admin_password
     )
     admin_dict = admin_obj.dict(exclude_none=True)
-    admin_dict["password"] = get_password_hash(admin_dict["password"])
-    await college_db["Admin"].insert_one(admin_dict)
+    # Hash first: a shed (503) hash must not leave a registered college without an admin
+    admin_dict["password"] = await password_hasher.hash(admin_dict["password"])
+
+    await SaaS_Management.colleges.insert_one(college_dict)
+    tenant_registry.invalidate(college.collegeId)
+
+    # Create the admin user in the college's database using college details
+    college_db = client[database_name]
+    result = await college_db["Admin"].insert_one(admin_dict)
+    await user_roles.add(college_db, college.collegeId, [result.inserted_id], "Admin")
     
     # Initialize meta collection
     await initialize_college_meta(college_db)
@@ -498,8 +1667,7 @@ async def create_college(request: CollegeRegistrationRequest):
 
 @app.post("/login")
 async def login(credentials: LoginSchema, response: Response):
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": credentials.collegeId})
+    college = await tenant_registry.get(credentials.collegeId)
     if not college:
         raise HTTPException(status_code=404, detail="College not found")
 
@@ -507,13 +1675,10 @@ async def login(credentials: LoginSchema, response: Response):
     user = await college_db[credentials.userType].find_one({"email": credentials.email})
     if not user:
         raise HTTPException(status_code=400, detail="User not found")
-    if not verify_password(credentials.password, user["password"]):
+    if not await password_hasher.verify(credentials.password, user["password"]):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    await college_db[credentials.userType].update_one(
-        {"_id": user["_id"]},
-        {"$set": {"lastSeen": get_current_time(), "status": "online"}}
-    )
+    presence.seen(credentials.collegeId, str(user["_id"]), credentials.userType, status="online")
 
     user["_id"] = str(user["_id"])
     token = create_access_token(user, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -630,7 +1795,7 @@ async def superadmin_login(credentials: SuperAdminLoginSchema, response: Respons
     superadmin = await db["SuperAdmin"].find_one({"name": credentials.name})
     if not superadmin:
         raise HTTPException(status_code=400, detail="Superadmin not found")
-    if not verify_password(credentials.password, superadmin["password"]):
+    if not await password_hasher.verify(credentials.password, superadmin["password"]):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     # Prepare user info for token
@@ -667,12 +1832,30 @@ async def superadmin_login(credentials: SuperAdminLoginSchema, response: Respons
     return {
         "user_info": user_info,
         "csrf_token": csrf_token
-    }    
+    }
+
+@app.get("/superadmin/metrics")
+async def get_metrics(current_user: dict = Depends(get_current_superadmin)):
+    """In-process cache and worker counters for this API worker."""
+    return {
+        "tenant_registry": tenant_registry.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "import_jobs": import_job_runner.stats(),
+        "message_writer": message_writer.stats(),
+        "group_members": group_members.stats(),
+        "user_roles": user_roles.stats(),
+        "directory_index": directory_index.stats(),
+        "typeahead_index": typeahead_index.stats(),
+        "mentor_index": mentor_index.stats(),
+        "websockets": manager.stats(),
+        "message_archiver": message_archiver.stats(),
+        "presence": presence.stats(),
+    }
 
 @app.post("/register")
 async def register(user: UserCreate, collegeId: str):
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": collegeId})
+    college = await tenant_registry.get(collegeId)
     if not college:
         raise HTTPException(status_code=404, detail="College not found")
 
@@ -695,10 +1878,14 @@ async def register(user: UserCreate, collegeId: str):
         user_schema = AdminSchema(**user_dict)
 
     user_dict = user_schema.dict()
-    user_dict["password"] = get_password_hash(user.password)
+    user_dict["password"] = await password_hasher.hash(user.password)
     user_dict["lastSeen"] = get_current_time()
 
     result = await college_db[role].insert_one(user_dict)
+    await user_roles.add(college_db, collegeId, [result.inserted_id], role)
+    directory_index.patch(collegeId, role, {**user_dict, "_id": result.inserted_id})
+    mentor_index.patch(collegeId, role, {**user_dict, "_id": result.inserted_id})
+    typeahead_index.patch(collegeId, role, {**user_dict, "_id": result.inserted_id})
     
     # Update meta collection
     if role == "Student":
@@ -706,24 +1893,22 @@ async def register(user: UserCreate, collegeId: str):
     elif role == "Alumni":
         await update_college_meta(college_db, "alumni")
     
-    new_user = await college_db[role].find_one({"_id": result.inserted_id})
-    new_user["_id"] = str(new_user["_id"])
+    new_user = dict(user_dict)
+    new_user["_id"] = str(result.inserted_id)
     del new_user["password"]
     return new_user
 
 @app.get("/users/me")
 async def read_users_me(current_user: dict = Depends(get_current_user)):
-    current_user["_id"] = str(current_user["_id"])
-    del current_user["collegeDb"]
-    return current_user
+    user = await load_full_profile(current_user)
+    user["_id"] = str(user["_id"])
+    return user
 
 @app.post("/users/me/skills")
 async def update_skill(current_user: dict = Depends(get_current_user), skill: dict = Body(...), _: str = Depends(verify_csrf)):
     # skill: {"skill": "new_skill"}
     print(skill)
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": current_user["collegeId"]})
-    college_db = client[college["databaseName"]]
+    college_db = current_user["collegeDb"]
     new_skill = skill.get("skill")
     if not new_skill or not isinstance(new_skill, str):
         raise HTTPException(status_code=400, detail="Invalid skill data")
@@ -742,6 +1927,9 @@ async def update_skill(current_user: dict = Depends(get_current_user), skill: di
         {"email": current_user["email"]},
         {"$addToSet": {"skills": new_skill}}
     )
+    principal_cache.invalidate(current_user["collegeId"], current_user["role"], current_user["email"])
+    await directory_index.refresh_user(college_db, current_user["collegeId"], current_user["role"], {"email": current_user["email"]})
+    await mentor_index.refresh_user(college_db, current_user["collegeId"], current_user["role"], {"email": current_user["email"]})
     print(result)
     return {"message": "Skill added successfully"}
 
@@ -749,9 +1937,7 @@ async def update_skill(current_user: dict = Depends(get_current_user), skill: di
 @app.put("/users/me")
 async def update_user_profile(current_user: dict = Depends(get_current_user), profile_data: dict = Body(...), _: str = Depends(verify_csrf)):
     # Update user profile information
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": current_user["collegeId"]})
-    college_db = client[college["databaseName"]]
+    college_db = current_user["collegeDb"]
     
     # Determine user collection based on role
     if current_user["role"] == "Student":
@@ -786,11 +1972,15 @@ async def update_user_profile(current_user: dict = Depends(get_current_user), pr
         {"$set": update_data}
     )
     
+    principal_cache.invalidate(current_user["collegeId"], current_user["role"], current_user["email"])
     if result.modified_count == 0:
         raise HTTPException(status_code=400, detail="Profile update failed")
     
     # Fetch and return the updated user document
     updated_user = await user_collection.find_one({"email": current_user["email"]})
+    directory_index.patch(current_user["collegeId"], current_user["role"], updated_user)
+    mentor_index.patch(current_user["collegeId"], current_user["role"], updated_user)
+    typeahead_index.patch(current_user["collegeId"], current_user["role"], updated_user)
     updated_user["_id"] = str(updated_user["_id"])
     if "password" in updated_user:
         del updated_user["password"]
@@ -800,9 +1990,7 @@ async def update_user_profile(current_user: dict = Depends(get_current_user), pr
 @app.post("/users/me/experience")
 async def update_experience(current_user: dict = Depends(get_current_user), experience: dict = Body(...), _: str = Depends(verify_csrf)):
     # Handle both direct experience object and wrapped experience object
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": current_user["collegeId"]})
-    college_db = client[college["databaseName"]]
+    college_db = current_user["collegeDb"]
     
     # Check if the experience is wrapped in an 'experience' field or sent directly
     new_experience = experience.get("experience") if "experience" in experience else experience
@@ -823,6 +2011,8 @@ async def update_experience(current_user: dict = Depends(get_current_user), expe
         {"email": current_user["email"]},
         {"$addToSet": {update_field: new_experience}}
     )
+    principal_cache.invalidate(current_user["collegeId"], current_user["role"], current_user["email"])
+    await typeahead_index.refresh_user(college_db, current_user["collegeId"], current_user["role"], {"email": current_user["email"]})
     
     # Return the experience data that was added
     return new_experience
@@ -838,16 +2028,7 @@ async def get_user_profile(user_id: str, current_user: dict = Depends(get_curren
     if not ObjectId.is_valid(user_id):
         raise HTTPException(status_code=400, detail="Invalid user ID format")
     
-    search_tasks = []
-    roles = ["Student", "Alumni", "Admin"]
-
-    for role in roles:
-        search_tasks.append(college_db[role].find_one({"_id": ObjectId(user_id)}))
-    
-    results = await asyncio.gather(*search_tasks)
-    
-    user = next((result for result in results if result is not None), None)
-    
+    _, user = await user_roles.find_user(college_db, current_user["collegeId"], user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -856,111 +2037,1788 @@ async def get_user_profile(user_id: str, current_user: dict = Depends(get_curren
     user["_id"] = str(user["_id"])
     return user
 
+# Directory: one (name, _id) ordering across the Student, Alumni and Admin collections
+DIRECTORY_ROLES = ["Student", "Alumni", "Admin"]
+DIRECTORY_SORT_FIELDS = ["name", "_id"]
+DIRECTORY_DEFAULT_FIELDS = ["name", "email", "department", "status", "lastSeen"]
+DIRECTORY_ALLOWED_FIELDS = {
+    "name", "email", "department", "location", "status", "lastSeen", "createdAt", "rollno", "prn",
+    "gradYear", "degree", "currentRole", "mentorshipStatus", "skills", "linkedin", "github", "description"
+}
+_directory_indexed_dbs = set()
+
+async def ensure_directory_indexes(college_db):
+    if college_db.name in _directory_indexed_dbs:
+        return
+    for role in DIRECTORY_ROLES:
+        await college_db[role].create_index([(field, 1) for field in DIRECTORY_SORT_FIELDS])
+    _directory_indexed_dbs.add(college_db.name)
+
+def directory_fields(fields: Optional[str], default: List[str] = DIRECTORY_DEFAULT_FIELDS, allowed: set = DIRECTORY_ALLOWED_FIELDS):
+    if not fields:
+        return default
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
 @app.get("/users/")
-async def read_users(skip: int = 0, limit: int = 100, current_user: dict = Depends(get_current_user)):
+async def read_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    The college directory across all roles, ordered by (name, _id).
+
+    Each page runs one indexed range query per role collection concurrently and k-way merges
+    them, so every page costs at most 3 x limit index entries however deep it is. Pass the
+    X-Next-Cursor header back as `cursor`; `fields` picks the returned fields (projected in Mongo).
+    """
     college_db = current_user["collegeDb"]
+    await ensure_directory_indexes(college_db)
+    limit = max(1, min(limit, 500))
+    selected = directory_fields(fields)
+    projection = {field: 1 for field in set(selected) | set(DIRECTORY_SORT_FIELDS)}
+    query = keyset_filter(DIRECTORY_SORT_FIELDS, decode_cursor(cursor, 2), 1) if cursor else {}
+    sort = [(field, 1) for field in DIRECTORY_SORT_FIELDS]
+
+    pages = await asyncio.gather(*(
+        college_db[role].find(query, projection).sort(sort).limit(limit).to_list(length=limit)
+        for role in DIRECTORY_ROLES
+    ))
+    merged = heapq.merge(
+        *([(user.get("name") or "", user["_id"], role, user) for user in page] for role, page in zip(DIRECTORY_ROLES, pages))
+    )
     users = []
-    for role in ["Student", "Alumni", "Admin"]:
-        async for user in college_db[role].find().skip(skip).limit(limit):
-            user["_id"] = str(user["_id"])
-            del user["password"]
-            users.append(user)
+    for name, _id, role, user in merged:
+        users.append({"_id": str(_id), "role": role, **{field: user.get(field) for field in selected}})
+        if len(users) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor([user.get("name"), _id])
+            break
     return users
 
-@app.post("/messages/")
-async def create_message(message: MessageCreate, current_user: dict = Depends(get_current_user)):
-    college_db = current_user["collegeDb"]
-    message_dict = message.dict()
-    message_dict["senderId"] = ObjectId(current_user["_id"])
-    if message_dict["receiverId"]:
-        message_dict["receiverId"] = ObjectId(message_dict["receiverId"])
-        receiver = await college_db[current_user["role"]].find_one({"_id": message_dict["receiverId"]})
-        if not receiver:
-            raise HTTPException(status_code=404, detail="Receiver not found")
-    if message_dict["groupId"]:
-        message_dict["groupId"] = ObjectId(message_dict["groupId"])
-        group = await college_db.groups.find_one({"_id": message_dict["groupId"]})
-        if not group:
-            raise HTTPException(status_code=404, detail="Group not found")
-    message_dict["timestamp"] = get_current_time()
-    message_dict["isRead"] = False
+# Faceted directory search: per-tenant inverted index over profile facets, held in memory
+FACET_FIELDS = ["role", "skills", "department", "gradYear", "degree", "currentRole", "mentorshipStatus"]
+FACET_ROLES = ["Student", "Alumni"]
+FACET_RESULT_FIELDS = ["name", "email", "department", "gradYear", "degree", "currentRole", "mentorshipStatus", "skills"]
+FACET_VALUES_LIMIT = int(os.getenv("FACET_VALUES_LIMIT", "20"))
+DIRECTORY_INDEX_REFRESH_SECONDS = int(os.getenv("DIRECTORY_INDEX_REFRESH_SECONDS", "900"))
+
+def _facet_values(profile: dict, field: str):
+    value = profile.get(field)
+    if value is None or value == "":
+        return []
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, (str, int)) and item != ""]
+    return [value] if isinstance(value, (str, int)) else []
+
+class TenantFacetIndex:
+    """
+    Profiles of one college with a bitmap posting list per facet value.
+
+    Every profile gets an ordinal; a posting list is a Python int with that ordinal's bit set,
+    so AND/OR across filters run in C over packed bits. Facet counts come from numpy
+    (ordinal, value) entry arrays: one bincount over the entries whose ordinal matches.
+    A build assigns ordinals in (name, _id) order, so matches page in order straight off the
+    bitmap; only profiles patched in since the build need sorting. Removed profiles leave
+    holes that the next rebuild compacts.
+    """
 
-    result = await college_db.messages.insert_one(message_dict)
-    new_message = await college_db.messages.find_one({"_id": result.inserted_id})
-    new_message["_id"] = str(new_message["_id"])
-    new_message["senderId"] = str(new_message["senderId"])
-    if new_message.get("receiverId"):
-        new_message["receiverId"] = str(new_message["receiverId"])
-    if new_message.get("groupId"):
-        new_message["groupId"] = str(new_message["groupId"])
-    return new_message
+    def __init__(self):
+        self.profiles: dict = {}
+        self.ordinals: dict = {}
+        self.slots: list = []
+        self.live = 0
+        self.postings = {field: {} for field in FACET_FIELDS}
+        self.value_ids = {field: {} for field in FACET_FIELDS}
+        self.value_names = {field: [] for field in FACET_FIELDS}
+        self.entries = {field: (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)) for field in FACET_FIELDS}
+        self._pending = {field: ([], []) for field in FACET_FIELDS}
+        self.sorted_count = 0
+        self.built_at = time.monotonic()
+
+    def _value_id(self, field: str, value):
+        value_id = self.value_ids[field].get(value)
+        if value_id is None:
+            value_id = self.value_ids[field][value] = len(self.value_names[field])
+            self.value_names[field].append(value)
+        return value_id
+
+    def _add_entries(self, field: str, ordinal: int, values: list):
+        # Entries are append-only; a removed ordinal is never a candidate, so its entries stop counting
+        docs, value_ids = self._pending[field]
+        for value in values:
+            docs.append(ordinal)
+            value_ids.append(self._value_id(field, value))
+
+    def _entry_arrays(self, field: str):
+        docs, value_ids = self._pending[field]
+        if docs:
+            current_docs, current_values = self.entries[field]
+            self.entries[field] = (
+                np.concatenate([current_docs, np.array(docs, dtype=np.int32)]),
+                np.concatenate([current_values, np.array(value_ids, dtype=np.int32)]),
+            )
+            self._pending[field] = ([], [])
+        return self.entries[field]
+
+    @staticmethod
+    def _sort_key(profile: dict):
+        return (profile.get("name") or "", profile["_id"])
+
+    def _ordinal_key(self, ordinal):
+        return self._sort_key(self.profiles[self.slots[int(ordinal)]])
+
+    def load(self, profiles: list):
+        """Bulk build: assign ordinals and assemble each posting bitmap once."""
+        profiles.sort(key=self._sort_key)
+        members = {field: {} for field in FACET_FIELDS}
+        for ordinal, profile in enumerate(profiles):
+            self.profiles[profile["_id"]] = profile
+            self.ordinals[profile["_id"]] = ordinal
+            self.slots.append(profile["_id"])
+            for field in FACET_FIELDS:
+                values = _facet_values(profile, field)
+                for value in values:
+                    members[field].setdefault(value, []).append(ordinal)
+                self._add_entries(field, ordinal, values)
+        size = (len(profiles) + 7) // 8
+        for field, values in members.items():
+            for value, ordinals in values.items():
+                bitmap = bytearray(size)
+                for ordinal in ordinals:
+                    bitmap[ordinal >> 3] |= 1 << (ordinal & 7)
+                self.postings[field][value] = int.from_bytes(bitmap, "little")
+        self.live = (1 << len(profiles)) - 1
+        self.sorted_count = len(profiles)
+        for field in FACET_FIELDS:
+            self._entry_arrays(field)
+
+    def upsert(self, profile: dict):
+        user_id = profile["_id"]
+        if user_id in self.profiles:
+            self.remove(user_id)
+        ordinal = len(self.slots)
+        bit = 1 << ordinal
+        self.slots.append(user_id)
+        self.ordinals[user_id] = ordinal
+        self.profiles[user_id] = profile
+        self.live |= bit
+        for field in FACET_FIELDS:
+            values = _facet_values(profile, field)
+            for value in values:
+                self.postings[field][value] = self.postings[field].get(value, 0) | bit
+            self._add_entries(field, ordinal, values)
+
+    def remove(self, user_id: str):
+        profile = self.profiles.pop(user_id, None)
+        if profile is None:
+            return
+        ordinal = self.ordinals.pop(user_id)
+        self.slots[ordinal] = None
+        clear = ~(1 << ordinal)
+        self.live &= clear
+        for field in FACET_FIELDS:
+            for value in _facet_values(profile, field):
+                remaining = self.postings[field].get(value, 0) & clear
+                if remaining:
+                    self.postings[field][value] = remaining
+                else:
+                    self.postings[field].pop(value, None)
+
+    def _matching(self, filters: dict, skip_field: Optional[str] = None):
+        """Bitmap of profiles matching every filtered field (OR within a field), or None for "everyone"."""
+        matches = None
+        for field, values in filters.items():
+            if field == skip_field:
+                continue
+            selected = 0
+            for value in values:
+                selected |= self.postings[field].get(value, 0)
+            matches = selected if matches is None else matches & selected
+        return matches
+
+    def _candidate_mask(self, candidates: Optional[int]):
+        """numpy bool array over ordinals for a candidate bitmap (None = every live profile)."""
+        size = len(self.slots)
+        bitmap = self.live if candidates is None else candidates
+        packed = np.frombuffer(bitmap.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+        return np.unpackbits(packed, bitorder="little")[:size].astype(bool)
+
+    def _facet_counts(self, field: str, mask):
+        names = self.value_names[field]
+        if not names:
+            return []
+        docs, value_ids = self._entry_arrays(field)
+        counts = np.bincount(value_ids[mask[docs]], minlength=len(names))
+        top = np.argsort(-counts, kind="stable")[:FACET_VALUES_LIMIT]
+        return [{"value": names[i], "count": int(counts[i])} for i in top if counts[i]]
+
+    def search(self, filters: dict, after: Optional[tuple], limit: int):
+        matches = self._matching(filters)
+        shared = self._candidate_mask(matches)
+        positions = np.flatnonzero(shared)
+        total = len(positions)
+
+        # Built ordinals are already in key order; patched-in ones are sorted and merged in
+        split = int(np.searchsorted(positions, self.sorted_count))
+        head, tail = positions[:split], positions[split:]
+        start = bisect.bisect_right(head, after, key=self._ordinal_key) if after else 0
+        head_keys = [self._ordinal_key(ordinal) for ordinal in head[start:start + limit]]
+        tail_keys = sorted(key for key in map(self._ordinal_key, tail) if after is None or key > after)
+        page = list(itertools.islice(heapq.merge(head_keys, tail_keys), limit))
+
+        # Disjunctive facets: each field is counted under every filter except its own
+        facets = {
+            field: self._facet_counts(
+                field, self._candidate_mask(self._matching(filters, skip_field=field)) if field in filters else shared
+            )
+            for field in FACET_FIELDS
+        }
+        return [self.profiles[user_id] for _, user_id in page], facets, total
 
-@app.get("/messages/")
-async def read_messages(
-    receiver_id: Optional[str] = None,
-    group_id: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100,
-    current_user: dict = Depends(get_current_user)
-):
-    college_db = current_user["collegeDb"]
-    
-    query = {}
-    if receiver_id:
-        query["$or"] = [
-            {"senderId": ObjectId(current_user["_id"]), "receiverId": ObjectId(receiver_id)},
-            {"senderId": ObjectId(receiver_id), "receiverId": ObjectId(current_user["_id"])}
-        ]
-        
-    elif group_id:
-        query["groupId"] = ObjectId(group_id)
-        print(ObjectId(group_id))
-        count = await college_db["messages"].find_one({'groupId': ObjectId('67e80be166b4381a3ba6812c')})
-        print(f"Messages found: {count}")
-        print(query)
-    else:
-        query["$or"] = [
-            {"receiverId": ObjectId(current_user["_id"])},
-            {"senderId": ObjectId(current_user["_id"])}
-        ]
-    cursor = college_db["messages"].find(query).sort("timestamp", -1).skip(skip).limit(limit)
-    messages = await cursor.to_list(length=None)
-    
-    messages = []
-    async for message in college_db["messages"].find(query).sort("timestamp", -1).skip(skip).limit(limit):
-        message["_id"] = str(message["_id"])
-        message["senderId"] = str(message["senderId"])
-        if message.get("receiverId"):
-            message["receiverId"] = str(message["receiverId"])
-        if message.get("groupId"):
-            message["groupId"] = str(message["groupId"])
-        messages.append(message)
-        
-    return messages
+class DirectorySearchIndex:
+    """Per-college TenantFacetIndex instances, built on first use, rebuilt in the background and patched on writes."""
 
-@app.post("/groups/")
-async def create_group(group: GroupCreate, current_user: dict = Depends(get_current_user)):
-    # Only allow admins to create groups
-    if current_user["role"] != "Admin":
-        raise HTTPException(status_code=403, detail="Only admins can create groups")
-        
-    college_db = current_user["collegeDb"]
+    roles = FACET_ROLES
+    fields = FACET_RESULT_FIELDS
+    index_class = TenantFacetIndex
 
-    group_dict = group.dict()
-    group_dict["createdAt"] = get_current_time()
-    group_dict["createdBy"] = ObjectId(current_user["_id"])
-    group_dict["admins"] = [ObjectId(current_user["_id"])]
-    group_dict["members"] = [ObjectId(current_user["_id"])] + [ObjectId(m) for m in group_dict["members"]]
+    def __init__(self, refresh_seconds: int = DIRECTORY_INDEX_REFRESH_SECONDS, max_tenants: Optional[int] = None):
+        self.refresh_seconds = refresh_seconds
+        self.max_tenants = max_tenants
+        self._tenants: OrderedDict = OrderedDict()
+        self._builds: dict = {}
+        self._replay: dict = {}
+        self.builds = 0
+        self.patches = 0
+        self.build_seconds_last = 0.0
 
-    result = await college_db.groups.insert_one(group_dict)
-    new_group = await college_db.groups.find_one({"_id": result.inserted_id})
-    new_group["_id"] = str(new_group["_id"])
-    new_group["createdBy"] = str(new_group["createdBy"])
-    new_group["admins"] = [str(a) for a in new_group["admins"]]
-    new_group["members"] = [str(m) for m in new_group["members"]]
-    return new_group
+    @classmethod
+    def compact(cls, role: str, user: dict):
+        profile = {"_id": str(user["_id"]), "role": role}
+        for field in cls.fields:
+            if user.get(field) is not None:
+                profile[field] = user[field]
+        return profile
+
+    async def _build(self, college_db, college_id: str):
+        started = time.perf_counter()
+        self._replay[college_id] = []
+        try:
+            index = self.index_class()
+            projection = {field: 1 for field in self.fields}
+            profiles = []
+            for role in self.roles:
+                async for user in college_db[role].find({}, projection):
+                    profiles.append(self.compact(role, user))
+            index.load(profiles)
+            # Writes that landed while the build was reading are applied on top
+            for operation, payload in self._replay.get(college_id, []):
+                if operation == "upsert":
+                    index.upsert(payload)
+                else:
+                    index.remove(payload)
+            self._tenants[college_id] = index
+            self._tenants.move_to_end(college_id)
+            if self.max_tenants and len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+            self.builds += 1
+            self.build_seconds_last = time.perf_counter() - started
+            return index
+        finally:
+            self._replay.pop(college_id, None)
+            self._builds.pop(college_id, None)
+
+    def _start_build(self, college_db, college_id: str):
+        build = self._builds.get(college_id)
+        if build is None:
+            build = self._builds[college_id] = asyncio.create_task(self._build(college_db, college_id))
+        return build
+
+    async def get(self, college_db, college_id: str):
+        index = self._tenants.get(college_id)
+        if index is None:
+            return await self._start_build(college_db, college_id)
+        self._tenants.move_to_end(college_id)
+        if time.monotonic() - index.built_at > self.refresh_seconds:
+            self._start_build(college_db, college_id)
+        return index
+
+    def _apply(self, college_id: str, operation: str, payload):
+        replay = self._replay.get(college_id)
+        if replay is not None:
+            replay.append((operation, payload))
+        index = self._tenants.get(college_id)
+        if index is not None:
+            self.patches += 1
+            if operation == "upsert":
+                index.upsert(payload)
+            else:
+                index.remove(payload)
 
-@app.get("/groups/")
+    def patch(self, college_id: str, role: str, user: dict):
+        if role in self.roles:
+            self._apply(college_id, "upsert", self.compact(role, user))
+
+    def patch_many(self, college_id: str, role: str, users: list):
+        for user in users:
+            self.patch(college_id, role, user)
+
+    async def refresh_user(self, college_db, college_id: str, role: str, user_filter: dict):
+        """Re-read one profile after a partial update and patch it in, if the tenant is indexed."""
+        if role not in self.roles or (college_id not in self._tenants and college_id not in self._replay):
+            return
+        user = await college_db[role].find_one(user_filter, {field: 1 for field in self.fields})
+        if user:
+            self.patch(college_id, role, user)
+
+    def remove(self, college_id: str, user_ids: list):
+        for user_id in user_ids:
+            self._apply(college_id, "remove", str(user_id))
+
+    def stats(self):
+        return {
+            "tenants": len(self._tenants),
+            "profiles": sum(len(index.profiles) for index in self._tenants.values()),
+            "building": len(self._builds),
+            "builds": self.builds,
+            "patches": self.patches,
+            "build_ms_last": round(self.build_seconds_last * 1000, 2),
+        }
+
+directory_index = DirectorySearchIndex()
+
+@app.get("/directory/search")
+async def search_directory(
+    response: Response,
+    role: Optional[List[str]] = Query(None),
+    skills: Optional[List[str]] = Query(None),
+    department: Optional[List[str]] = Query(None),
+    gradYear: Optional[List[int]] = Query(None),
+    degree: Optional[List[str]] = Query(None),
+    currentRole: Optional[List[str]] = Query(None),
+    mentorshipStatus: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Student and alumni profiles matching the given facets, with counts per facet value.
+
+    Repeat a parameter to OR values (skills=python&skills=go); different parameters AND.
+    Results are ordered by (name, _id); pass X-Next-Cursor back as `cursor`.
+    """
+    limit = max(1, min(limit, 200))
+    requested = {
+        "role": role, "skills": skills, "department": department, "gradYear": gradYear,
+        "degree": degree, "currentRole": currentRole, "mentorshipStatus": mentorshipStatus,
+    }
+    filters = {field: values for field, values in requested.items() if values}
+    after = tuple(decode_cursor(cursor, 2)) if cursor else None
+
+    index = await directory_index.get(current_user["collegeDb"], current_user["collegeId"])
+    started = time.perf_counter()
+    results, facets, total = index.search(filters, after, limit)
+    response.headers["X-Search-Time-Ms"] = f"{(time.perf_counter() - started) * 1000:.2f}"
+    if len(results) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor([results[-1].get("name") or "", results[-1]["_id"]])
+    return {"total": total, "results": results, "facets": facets}
+
+# Typeahead: per-tenant sorted prefix index over names, emails and company names
+TYPEAHEAD_ROLES = ["Student", "Alumni", "Admin"]
+TYPEAHEAD_MATCHES = ["name", "name", "email", "company"]  # by the rank digit stored in each entry
+TYPEAHEAD_MAX_TERM_CHARS = int(os.getenv("TYPEAHEAD_MAX_TERM_CHARS", "32"))
+TYPEAHEAD_SCAN_LIMIT = int(os.getenv("TYPEAHEAD_SCAN_LIMIT", "2000"))
+TYPEAHEAD_MAX_TENANTS = int(os.getenv("TYPEAHEAD_MAX_TENANTS", "50"))
+
+def typeahead_term(text):
+    if not isinstance(text, str):
+        return ""
+    return " ".join(text.replace("\x00", "").casefold().split())[:TYPEAHEAD_MAX_TERM_CHARS]
+
+def _experience_companies(experience):
+    if isinstance(experience, dict):
+        experience = [experience]
+    if not isinstance(experience, list):
+        return []
+    return [item["company"] for item in experience if isinstance(item, dict) and isinstance(item.get("company"), str)]
+
+class TenantPrefixIndex:
+    """
+    Typeahead terms of one college, one sorted list of strings per role.
+
+    Each entry is "<term>\\x00<rank><user id>", where the term is a normalised name, name word,
+    email or company truncated to TYPEAHEAD_MAX_TERM_CHARS. A lookup bisects to the prefix in the
+    lists of the requested roles and scans forward while entries still start with it. Terms come
+    out in lexicographic order, so when a prefix matches more than TYPEAHEAD_SCAN_LIMIT live
+    entries only the first ones are ranked. Writes go to a small sorted side list and a tombstone
+    set per role that are merged into the main list once they grow past a fraction of it.
+    """
+
+    def __init__(self):
+        self.profiles: dict = {}
+        self.entries: dict = {}
+        self.pending: dict = {}
+        self.removed: dict = {}
+        self.built_at = time.monotonic()
+
+    @staticmethod
+    def _entries(profile: dict):
+        ranks = {}
+        def add(text, rank):
+            term = typeahead_term(text)
+            if term and rank < ranks.get(term, len(TYPEAHEAD_MATCHES)):
+                ranks[term] = rank
+        add(profile.get("name"), 0)
+        for word in typeahead_term(profile.get("name")).split()[1:]:
+            add(word, 1)
+        add(profile.get("email"), 2)
+        for company in profile.get("companies", []):
+            add(company, 3)
+        return [f"{term}\x00{rank}{profile['_id']}" for term, rank in ranks.items()]
+
+    def load(self, profiles: list):
+        for profile in profiles:
+            self.profiles[profile["_id"]] = profile
+            self.entries.setdefault(profile["role"], []).extend(self._entries(profile))
+        for entries in self.entries.values():
+            entries.sort()
+
+    def upsert(self, profile: dict):
+        if profile["_id"] in self.profiles:
+            self.remove(profile["_id"])
+        role = profile["role"]
+        self.profiles[profile["_id"]] = profile
+        pending, removed = self.pending.setdefault(role, []), self.removed.setdefault(role, set())
+        for entry in self._entries(profile):
+            if entry in removed:
+                removed.discard(entry)
+            else:
+                bisect.insort(pending, entry)
+        self._maybe_compact(role)
+
+    def remove(self, user_id: str):
+        profile = self.profiles.pop(user_id, None)
+        if profile is None:
+            return
+        role = profile["role"]
+        pending, removed = self.pending.setdefault(role, []), self.removed.setdefault(role, set())
+        for entry in self._entries(profile):
+            position = bisect.bisect_left(pending, entry)
+            if position < len(pending) and pending[position] == entry:
+                del pending[position]
+            else:
+                removed.add(entry)
+        self._maybe_compact(role)
+
+    def _maybe_compact(self, role: str):
+        entries, pending, removed = self.entries.get(role, []), self.pending[role], self.removed[role]
+        if len(pending) + len(removed) > max(1024, len(entries) // 64):
+            self.entries[role] = [entry for entry in heapq.merge(entries, pending) if entry not in removed]
+            self.pending[role] = []
+            self.removed[role] = set()
+
+    @staticmethod
+    def _scan(entries: list, prefix: str, removed: set = frozenset()):
+        position = bisect.bisect_left(entries, prefix)
+        while position < len(entries) and entries[position].startswith(prefix):
+            if entries[position] not in removed:
+                yield entries[position]
+            position += 1
+
+    def search(self, prefix: str, roles: Optional[List[str]], limit: int):
+        scans = []
+        for role in (roles or set(self.entries) | set(self.pending)):
+            scans.append(self._scan(self.entries.get(role, []), prefix, self.removed.get(role, set())))
+            scans.append(self._scan(self.pending.get(role, []), prefix))
+        best = {}
+        # Only live entries of the requested roles reach the cap
+        for entry in itertools.islice(heapq.merge(*scans), TYPEAHEAD_SCAN_LIMIT):
+            term, _, tail = entry.partition("\x00")
+            profile = self.profiles.get(tail[1:])
+            if profile is None:
+                continue
+            score = (int(tail[0]), len(term))
+            if score < best.get(profile["_id"], (len(TYPEAHEAD_MATCHES),)):
+                best[profile["_id"]] = score
+        ranked = heapq.nsmallest(
+            limit, best.items(), key=lambda item: (item[1], self.profiles[item[0]].get("name") or "", item[0])
+        )
+        return [{**self.profiles[user_id], "matched": TYPEAHEAD_MATCHES[score[0]]} for user_id, score in ranked]
+
+class TypeaheadIndex(DirectorySearchIndex):
+    """Per-college TenantPrefixIndex instances, with the directory index lifecycle and an LRU cap on tenants."""
+
+    roles = TYPEAHEAD_ROLES
+    fields = ["name", "email", "currentRole", "professionalExperience.company", "Experience.company"]
+    index_class = TenantPrefixIndex
+
+    @classmethod
+    def compact(cls, role: str, user: dict):
+        profile = {"_id": str(user["_id"]), "role": role, "name": user.get("name"), "email": user.get("email")}
+        companies = [user["currentRole"]] if isinstance(user.get("currentRole"), str) else []
+        companies += _experience_companies(user.get("professionalExperience"))
+        companies += _experience_companies(user.get("Experience"))
+        companies = list(dict.fromkeys(company for company in companies if company.strip()))
+        if companies:
+            profile["companies"] = companies
+        return profile
+
+typeahead_index = TypeaheadIndex(max_tenants=TYPEAHEAD_MAX_TENANTS)
+
+@app.get("/directory/typeahead")
+async def typeahead(
+    response: Response,
+    q: str,
+    role: Optional[List[str]] = Query(None),
+    limit: int = 10,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    People whose name, a word of their name, email or company starts with `q`, best matches first.
+
+    Full-name matches rank above name-word, email and company matches; shorter matching terms
+    rank higher within each. Case-insensitive; at most `limit` (<= 50) results.
+    """
+    limit = max(1, min(limit, 50))
+    prefix = typeahead_term(q)
+    if not prefix:
+        return []
+    index = await typeahead_index.get(current_user["collegeDb"], current_user["collegeId"])
+    started = time.perf_counter()
+    results = index.search(prefix, role, limit)
+    response.headers["X-Search-Time-Ms"] = f"{(time.perf_counter() - started) * 1000:.2f}"
+    return results
+
+# Mentor matching: per-tenant sparse skill matrices for students and alumni, scored with numpy
+MENTOR_ROLES = ["Student", "Alumni"]
+MENTOR_FIELDS = ["name", "skills", "department", "degree", "mentorshipStatus", "mentorCapacity"]
+MENTOR_AVAILABLE_STATUSES = {status.strip().lower() for status in os.getenv("MENTOR_AVAILABLE_STATUSES", "available").split(",") if status.strip()}
+MENTOR_DEFAULT_CAPACITY = int(os.getenv("MENTOR_DEFAULT_CAPACITY", "3"))
+MENTOR_SKILL_WEIGHT = float(os.getenv("MENTOR_SKILL_WEIGHT", "0.7"))
+MENTOR_DEPARTMENT_WEIGHT = float(os.getenv("MENTOR_DEPARTMENT_WEIGHT", "0.2"))
+MENTOR_DEGREE_WEIGHT = float(os.getenv("MENTOR_DEGREE_WEIGHT", "0.1"))
+MENTOR_CANDIDATES = int(os.getenv("MENTOR_CANDIDATES", "20"))  # per student, considered by the global assignment
+MENTOR_SCORE_BATCH_SIZE = int(os.getenv("MENTOR_SCORE_BATCH_SIZE", "256"))
+
+def _grown(array, size: int):
+    grown = np.zeros(size, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+class MentorRows:
+    """One side of a tenant's matrix: a row per profile, patched in place; skills pack into CSR on demand."""
+
+    def __init__(self):
+        self.ids: list = []
+        self.positions: dict = {}
+        self.skills: list = []
+        self.department = np.zeros(0, dtype=np.int32)
+        self.degree = np.zeros(0, dtype=np.int32)
+        self.capacity = np.zeros(0, dtype=np.int32)
+        self.active = np.zeros(0, dtype=bool)
+        self._csr = None
+
+    def set(self, user_id: str, skills, department: int, degree: int, capacity: int, active: bool):
+        row = self.positions.get(user_id)
+        if row is None:
+            row = self.positions[user_id] = len(self.ids)
+            self.ids.append(user_id)
+            self.skills.append(skills)
+            if row == len(self.active):
+                size = max(64, 2 * row)
+                self.department, self.degree = _grown(self.department, size), _grown(self.degree, size)
+                self.capacity, self.active = _grown(self.capacity, size), _grown(self.active, size)
+        else:
+            self.skills[row] = skills
+        self.department[row] = department
+        self.degree[row] = degree
+        self.capacity[row] = capacity
+        self.active[row] = active
+        self._csr = None
+
+    def deactivate(self, user_id: str):
+        row = self.positions.get(user_id)
+        if row is not None:
+            self.active[row] = False
+            self.skills[row] = np.zeros(0, dtype=np.int32)
+            self._csr = None
+
+    def csr(self):
+        if self._csr is None:
+            indptr = np.zeros(len(self.skills) + 1, dtype=np.int64)
+            np.cumsum([len(skills) for skills in self.skills], out=indptr[1:])
+            indices = np.concatenate(self.skills) if self.skills else np.zeros(0, dtype=np.int32)
+            self._csr = (indptr, indices)
+        return self._csr
+
+class MentorScorer:
+    """
+    Immutable snapshot of a tenant's matrices, safe to score on a worker thread.
+
+    A student's score against a mentor is the IDF-weighted share of the student's skills the
+    mentor also lists, plus department and degree affinity, each with its MENTOR_*_WEIGHT.
+    Only available mentors with capacity are scored; `mentors` maps score columns to alumni rows.
+    """
+
+    def __init__(self, students: MentorRows, alumni: MentorRows, vocabulary: int):
+        student_count, alumni_count = len(students.ids), len(alumni.ids)
+        self.student_ids = list(students.ids)
+        self.student_skills = list(students.skills)
+        self.student_department = students.department[:student_count].copy()
+        self.student_degree = students.degree[:student_count].copy()
+        self.student_active = students.active[:student_count].copy()
+        self.alumni_ids = list(alumni.ids)
+        self.indptr, self.indices = alumni.csr()
+        self.mentors = np.flatnonzero(alumni.active[:alumni_count] & (alumni.capacity[:alumni_count] > 0))
+        self.capacity = alumni.capacity[self.mentors]
+        # Unknown codes are -1 for students and -2 for mentors, so they never count as a match
+        self.mentor_department = np.where(alumni.department[self.mentors] >= 0, alumni.department[self.mentors], -2)
+        self.mentor_degree = np.where(alumni.degree[self.mentors] >= 0, alumni.degree[self.mentors], -2)
+
+        # Column-major skills of the scored mentors: skill -> mentor columns
+        column_of = np.full(alumni_count, -1, dtype=np.int64)
+        column_of[self.mentors] = np.arange(len(self.mentors))
+        entry_columns = np.repeat(column_of, np.diff(self.indptr))
+        live = entry_columns >= 0
+        order = np.argsort(self.indices[live], kind="stable")
+        self.skill_mentors = entry_columns[live][order]
+        frequency = np.bincount(self.indices[live], minlength=vocabulary)
+        self.skill_starts = np.zeros(vocabulary + 1, dtype=np.int64)
+        np.cumsum(frequency, out=self.skill_starts[1:])
+        # A skill few mentors list says more about a match than one they all do
+        self.weights = (np.log((1 + len(self.mentors)) / (1 + frequency)) + 1).astype(np.float32)
+
+    def alumni_skills(self, row: int):
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    def scores(self, rows):
+        """(len(rows) x mentors) score matrix for the given student rows."""
+        width = len(self.mentors)
+        skills = [self.student_skills[row] for row in rows]
+        lengths = [len(columns) for columns in skills]
+        columns = np.concatenate(skills) if sum(lengths) else np.zeros(0, dtype=np.int32)
+        owners = np.repeat(np.arange(len(rows)), lengths)
+        # Sparse x sparse: expand each (student, skill) into the mentors listing it, then sum per pair
+        counts = self.skill_starts[columns + 1] - self.skill_starts[columns]
+        ends = np.cumsum(counts)
+        entries = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts - self.skill_starts[columns], counts)
+        totals = np.bincount(owners, weights=self.weights[columns], minlength=len(rows))
+        scale = np.divide(MENTOR_SKILL_WEIGHT, totals, out=np.zeros(len(rows)), where=totals > 0)
+        scores = np.bincount(
+            np.repeat(owners, counts) * width + self.skill_mentors[entries],
+            weights=np.repeat(self.weights[columns] * scale[owners], counts),
+            minlength=len(rows) * width,
+        ).astype(np.float32).reshape(len(rows), width)
+        scores += MENTOR_DEPARTMENT_WEIGHT * (self.student_department[rows][:, None] == self.mentor_department)
+        scores += MENTOR_DEGREE_WEIGHT * (self.student_degree[rows][:, None] == self.mentor_degree)
+        return scores
+
+    def top(self, rows, k: int):
+        """Best k mentor columns and scores per student row, best first; -1 pads slots without a positive score."""
+        rows = np.asarray(rows, dtype=np.int64)
+        k = min(k, len(self.mentors))
+        best_columns = np.full((len(rows), k), -1, dtype=np.int64)
+        best_scores = np.zeros((len(rows), k), dtype=np.float32)
+        if not k:
+            return best_columns, best_scores
+        for start in range(0, len(rows), MENTOR_SCORE_BATCH_SIZE):
+            batch = self.scores(rows[start:start + MENTOR_SCORE_BATCH_SIZE])
+            if k < len(self.mentors):
+                columns = np.argpartition(-batch, k - 1, axis=1)[:, :k]
+            else:
+                columns = np.tile(np.arange(k), (len(batch), 1))
+            scores = np.take_along_axis(batch, columns, axis=1)
+            order = np.argsort(-scores, axis=1, kind="stable")
+            columns, scores = np.take_along_axis(columns, order, axis=1), np.take_along_axis(scores, order, axis=1)
+            positive = scores > 0
+            best_columns[start:start + len(batch)] = np.where(positive, columns, -1)
+            best_scores[start:start + len(batch)] = np.where(positive, scores, 0)
+        return best_columns, best_scores
+
+    def assign(self):
+        """
+        Stable many-to-one assignment within mentor capacities, over each student's top
+        MENTOR_CANDIDATES. Students propose down their list; each mentor keeps its best
+        proposals up to capacity. Every round is a handful of vectorised ops.
+        Returns (student rows, alumni rows, scores, unassigned student rows).
+        """
+        students = np.flatnonzero(self.student_active)
+        candidates, candidate_scores = self.top(students, MENTOR_CANDIDATES)
+        width = candidates.shape[1]
+        choice = np.zeros(len(students), dtype=np.int64)
+        held = np.zeros(0, dtype=np.int64)
+        free = np.arange(len(students))
+        while True:
+            free = free[choice[free] < width]
+            free = free[candidates[free, choice[free]] >= 0]
+            if not len(free):
+                break
+            pool = np.concatenate([held, free])
+            scores = candidate_scores[pool, choice[pool]]
+            chosen = candidates[pool, choice[pool]]
+            order = np.lexsort((-scores, chosen))
+            pool, chosen = pool[order], chosen[order]
+            starts = np.flatnonzero(np.r_[True, chosen[1:] != chosen[:-1]])
+            rank = np.arange(len(pool)) - np.repeat(starts, np.diff(np.r_[starts, len(pool)]))
+            keep = rank < self.capacity[chosen]
+            held, free = pool[keep], pool[~keep]
+            choice[free] += 1
+        assigned = np.zeros(len(students), dtype=bool)
+        assigned[held] = True
+        held = np.sort(held)
+        return (
+            students[held], self.mentors[candidates[held, choice[held]]],
+            candidate_scores[held, choice[held]], students[~assigned],
+        )
+
+class TenantMentorMatrix:
+    """
+    Students and alumni of one college as sparse skill rows plus department/degree codes.
+
+    Writes patch a single row in place; matching runs on a cached MentorScorer snapshot that
+    is re-taken (packing the alumni skills into CSR once) on the first match after a write.
+    """
+
+    def __init__(self):
+        self.profiles: dict = {}
+        self.rows = {role: MentorRows() for role in MENTOR_ROLES}
+        self.skill_columns: dict = {}
+        self.skill_names: list = []
+        self.codes = {"department": {}, "degree": {}}
+        self.built_at = time.monotonic()
+        self._scorer = None
+
+    def _code(self, field: str, value):
+        if not isinstance(value, str) or not value.strip():
+            return -1
+        return self.codes[field].setdefault(value.strip().casefold(), len(self.codes[field]))
+
+    def _columns(self, skills):
+        columns = set()
+        for skill in skills if isinstance(skills, list) else []:
+            if not isinstance(skill, str) or not skill.strip():
+                continue
+            key = skill.strip().casefold()
+            if key not in self.skill_columns:
+                self.skill_columns[key] = len(self.skill_names)
+                self.skill_names.append(skill.strip())
+            columns.add(self.skill_columns[key])
+        return np.array(sorted(columns), dtype=np.int32)
+
+    def load(self, profiles: list):
+        for profile in profiles:
+            self.upsert(profile)
+
+    def upsert(self, profile: dict):
+        if profile["role"] == "Alumni":
+            capacity = profile.get("mentorCapacity")
+            capacity = capacity if isinstance(capacity, int) and capacity >= 0 else MENTOR_DEFAULT_CAPACITY
+            active = str(profile.get("mentorshipStatus") or "").lower() in MENTOR_AVAILABLE_STATUSES
+        else:
+            capacity, active = 0, True
+        self.profiles[profile["_id"]] = profile
+        self.rows[profile["role"]].set(
+            profile["_id"], self._columns(profile.get("skills")), self._code("department", profile.get("department")),
+            self._code("degree", profile.get("degree")), capacity, active
+        )
+        self._scorer = None
+
+    def remove(self, user_id: str):
+        profile = self.profiles.pop(user_id, None)
+        if profile is not None:
+            self.rows[profile["role"]].deactivate(user_id)
+            self._scorer = None
+
+    def scorer(self):
+        if self._scorer is None:
+            self._scorer = MentorScorer(self.rows["Student"], self.rows["Alumni"], len(self.skill_names))
+        return self._scorer
+
+    def mentor(self, scorer: MentorScorer, student_row: int, alumni_row: int, score: float):
+        alumnus = self.profiles.get(scorer.alumni_ids[alumni_row], {})
+        shared = np.intersect1d(scorer.student_skills[student_row], scorer.alumni_skills(alumni_row), assume_unique=True)
+        return {
+            "_id": scorer.alumni_ids[alumni_row],
+            "name": alumnus.get("name"),
+            "department": alumnus.get("department"),
+            "degree": alumnus.get("degree"),
+            "score": round(float(score), 4),
+            "sharedSkills": [self.skill_names[column] for column in shared],
+        }
+
+class MentorMatchIndex(DirectorySearchIndex):
+    """Per-college TenantMentorMatrix instances, with the directory index build, refresh and patch lifecycle."""
+
+    roles = MENTOR_ROLES
+    fields = MENTOR_FIELDS
+    index_class = TenantMentorMatrix
+
+mentor_index = MentorMatchIndex()
+
+@app.get("/mentorship/matches")
+async def mentor_matches(
+    response: Response,
+    student_id: Optional[List[str]] = Query(None),
+    k: int = 5,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Top-k available alumni mentors per student. Students get their own matches; admins pass
+    one or more `student_id`s (up to 100).
+    """
+    if current_user["role"] == "Student":
+        student_ids = [str(current_user["_id"])]
+    elif current_user["role"] == "Admin":
+        if not student_id:
+            raise HTTPException(status_code=400, detail="student_id is required")
+        student_ids = list(dict.fromkeys(student_id))[:100]
+    else:
+        raise HTTPException(status_code=403, detail="Only students and admins can view mentor matches")
+    k = max(1, min(k, 50))
+
+    index = await mentor_index.get(current_user["collegeDb"], current_user["collegeId"])
+    started = time.perf_counter()
+    scorer = index.scorer()
+    positions = index.rows["Student"].positions
+    rows = [
+        positions[user_id] for user_id in student_ids
+        if positions.get(user_id, len(scorer.student_ids)) < len(scorer.student_ids) and scorer.student_active[positions[user_id]]
+    ]
+    columns, scores = scorer.top(rows, k)
+    by_student = {
+        scorer.student_ids[row]: [
+            index.mentor(scorer, row, scorer.mentors[column], score) for column, score in zip(columns[i], scores[i]) if column >= 0
+        ]
+        for i, row in enumerate(rows)
+    }
+    response.headers["X-Match-Time-Ms"] = f"{(time.perf_counter() - started) * 1000:.2f}"
+    return [{"studentId": user_id, "mentors": by_student.get(user_id, [])} for user_id in student_ids]
+
+@app.get("/mentorship/assignments")
+async def mentor_assignments(response: Response, current_user: dict = Depends(get_current_user)):
+    """
+    One mentor per student across the whole college, within each mentor's capacity
+    (mentorCapacity, default MENTOR_DEFAULT_CAPACITY). Scored on a worker thread.
+    """
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Only college admins can assign mentors")
+    index = await mentor_index.get(current_user["collegeDb"], current_user["collegeId"])
+    started = time.perf_counter()
+    scorer = index.scorer()
+    students, mentors, scores, unassigned = await asyncio.to_thread(scorer.assign)
+    assignments = []
+    for student, mentor, score in zip(students, mentors, scores):
+        match = index.mentor(scorer, student, mentor, score)
+        student_profile = index.profiles.get(scorer.student_ids[student], {})
+        assignments.append({
+            "studentId": scorer.student_ids[student], "studentName": student_profile.get("name"),
+            "mentorId": match["_id"], "mentorName": match["name"], "score": match["score"],
+            "sharedSkills": match["sharedSkills"],
+        })
+    response.headers["X-Match-Time-Ms"] = f"{(time.perf_counter() - started) * 1000:.2f}"
+    return {
+        "assignments": assignments,
+        "unassigned": [scorer.student_ids[student] for student in unassigned],
+        "availableMentors": len(scorer.mentors),
+    }
+
+def serialize_message(message: dict):
+    """Copy of a message document with ObjectIds as strings, built without re-reading it."""
+    serialized = dict(message)
+    serialized["_id"] = str(message["_id"])
+    serialized["senderId"] = str(message["senderId"])
+    if message.get("receiverId"):
+        serialized["receiverId"] = str(message["receiverId"])
+    if message.get("groupId"):
+        serialized["groupId"] = str(message["groupId"])
+    return serialized
+
+def websocket_message_payload(message: dict, **extra):
+    """The `data` object sent over /ws for a stored message."""
+    payload = {
+        "_id": str(message["_id"]),
+        "content": message["content"],
+        "senderId": str(message["senderId"]),
+    }
+    if message.get("receiverId"):
+        payload["receiverId"] = str(message["receiverId"])
+    if message.get("groupId"):
+        payload["groupId"] = str(message["groupId"])
+    payload.update(extra)
+    payload["timestamp"] = message["timestamp"].astimezone(IST).isoformat()
+    payload["isRead"] = message["isRead"]
+    return payload
+
+async def store_message(college_db, message: dict):
+    """Persist a message and update the derived conversation summaries; sets message["_id"]."""
+    await college_db.messages.insert_one(message)
+    await record_conversation_message(college_db, message)
+    return message
+
+# Write-behind message persistence (opt-in via MESSAGE_WRITE_BEHIND)
+MESSAGE_WRITE_BEHIND = os.getenv("MESSAGE_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+MESSAGE_FLUSH_BATCH_SIZE = int(os.getenv("MESSAGE_FLUSH_BATCH_SIZE", "200"))
+MESSAGE_FLUSH_INTERVAL_MS = int(os.getenv("MESSAGE_FLUSH_INTERVAL_MS", "50"))
+MESSAGE_QUEUE_MAX = int(os.getenv("MESSAGE_QUEUE_MAX", "10000"))
+
+class MessageWriteBehind:
+    """
+    Per-tenant queues that persist messages with batched insert_many.
+
+    Messages get their _id client-side so they can be delivered before they are stored.
+    Each queue is flushed when it reaches the batch size or the flush interval elapses,
+    and every submitted message carries a future that resolves once its batch is stored.
+    """
+
+    def __init__(self, batch_size: int = MESSAGE_FLUSH_BATCH_SIZE, flush_interval_ms: int = MESSAGE_FLUSH_INTERVAL_MS,
+                 max_queue: int = MESSAGE_QUEUE_MAX):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue = max_queue
+        self._queues: dict = {}
+        self._flushers: dict = {}
+        self._closing = False
+        self.enqueued = 0
+        self.persisted = 0
+        self.failed = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+
+    async def submit(self, college_db, message: dict):
+        if self._closing:
+            raise HTTPException(status_code=503, detail="Server is shutting down")
+        message.setdefault("_id", ObjectId())
+        queue = self._queues.get(college_db.name)
+        if queue is None:
+            queue = self._queues[college_db.name] = asyncio.Queue(maxsize=self.max_queue)
+            self._flushers[college_db.name] = asyncio.create_task(self._flush_loop(college_db, queue))
+        persisted = asyncio.get_running_loop().create_future()
+        # A full queue applies backpressure to the producer instead of growing without bound
+        await queue.put((message, persisted))
+        self.enqueued += 1
+        return persisted
+
+    async def _flush_loop(self, college_db, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._flush(college_db, batch)
+            except Exception as e:
+                # Drop the batch rather than kill the loop: senders get a failed ack, the queue keeps draining
+                print(f"Error flushing {len(batch)} messages for {college_db.name}: {e}")
+                for message, persisted in batch:
+                    if not persisted.done():
+                        self.failed += 1
+                        persisted.set_exception(RuntimeError("Message could not be stored"))
+            if stopping:
+                return
+
+    async def _flush(self, college_db, batch: list):
+        started = time.perf_counter()
+        failed = {}
+        try:
+            await college_db.messages.insert_many([message for message, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = error.get("errmsg", "write error")
+        except Exception as e:
+            failed = {index: str(e) for index in range(len(batch))}
+
+        try:
+            await record_conversation_messages(
+                college_db, [message for index, (message, _) in enumerate(batch) if index not in failed]
+            )
+        except Exception as e:
+            print(f"Error updating conversation summaries: {e}")
+
+        for index, (message, persisted) in enumerate(batch):
+            if index in failed:
+                self.failed += 1
+                if not persisted.done():
+                    persisted.set_exception(RuntimeError(failed[index]))
+                continue
+            self.persisted += 1
+            if not persisted.done():
+                persisted.set_result(message["_id"])
+
+        took = time.perf_counter() - started
+        self.flushes += 1
+        self.flush_seconds_total += took
+        self.flush_seconds_max = max(self.flush_seconds_max, took)
+
+    async def drain(self):
+        """Stop accepting messages and flush everything still queued."""
+        self._closing = True
+        for queue in self._queues.values():
+            await queue.put(None)
+        if self._flushers:
+            await asyncio.gather(*self._flushers.values(), return_exceptions=True)
+
+    def stats(self):
+        flushes = self.flushes or 1
+        return {
+            "enabled": MESSAGE_WRITE_BEHIND,
+            "queue_depth": sum(queue.qsize() for queue in self._queues.values()),
+            "tenants": len(self._queues),
+            "enqueued": self.enqueued,
+            "persisted": self.persisted,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "flush_ms_avg": round(self.flush_seconds_total / flushes * 1000, 2),
+            "flush_ms_max": round(self.flush_seconds_max * 1000, 2),
+        }
+
+message_writer = MessageWriteBehind()
+
+async def persist_message(college_db, message: dict):
+    """
+    Store a message directly or through the write-behind queue.
+    Returns an awaitable that resolves with the message _id once it is durable;
+    message["_id"] is always set when this returns.
+    """
+    if MESSAGE_WRITE_BEHIND:
+        return await message_writer.submit(college_db, message)
+    await store_message(college_db, message)
+    persisted = asyncio.get_running_loop().create_future()
+    persisted.set_result(message["_id"])
+    return persisted
+
+async def store_messages(college_db, messages: list):
+    """Persist several messages with one insert_many; returns {index: error} for the ones that failed."""
+    for message in messages:
+        message.setdefault("_id", ObjectId())
+    failed = {}
+    try:
+        await college_db.messages.insert_many(messages, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed[error["index"]] = error.get("errmsg", "write error")
+    except Exception as e:
+        failed = {index: str(e) for index in range(len(messages))}
+    await record_conversation_messages(college_db, [m for index, m in enumerate(messages) if index not in failed])
+    return failed
+
+async def persist_messages(college_db, messages: list):
+    """Batch counterpart of persist_message: one awaitable per message, in order."""
+    if MESSAGE_WRITE_BEHIND:
+        return [await message_writer.submit(college_db, message) for message in messages]
+    failed = await store_messages(college_db, messages) if messages else {}
+    loop = asyncio.get_running_loop()
+    futures = []
+    for index, message in enumerate(messages):
+        persisted = loop.create_future()
+        if index in failed:
+            persisted.set_exception(RuntimeError(failed[index]))
+        else:
+            persisted.set_result(message["_id"])
+        futures.append(persisted)
+    return futures
+
+async def acknowledge_message(persisted, message_id: ObjectId, client_id, user_id: str, college_id: str):
+    """Tell the sender whether their message has been stored."""
+    try:
+        await persisted
+        ack = {"_id": str(message_id), "clientId": client_id, "status": "persisted"}
+    except Exception as e:
+        print(f"Error persisting message {message_id}: {e}")
+        ack = {"_id": str(message_id), "clientId": client_id, "status": "failed"}
+    await manager.send_personal_message(json.dumps({"type": "ack", "data": ack}), user_id, college_id)
+
+@app.on_event("shutdown")
+async def drain_message_writer():
+    await message_writer.drain()
+
+@app.post("/messages/")
+async def create_message(message: MessageCreate, current_user: dict = Depends(get_current_user)):
+    college_db = current_user["collegeDb"]
+    message_dict = message.dict()
+    message_dict["senderId"] = ObjectId(current_user["_id"])
+    if message_dict["receiverId"]:
+        message_dict["receiverId"] = ObjectId(message_dict["receiverId"])
+        # Receivers can be in any role collection; the routing index knows which
+        if not await user_roles.role_of(college_db, current_user["collegeId"], str(message_dict["receiverId"])):
+            raise HTTPException(status_code=404, detail="Receiver not found")
+    if message_dict["groupId"]:
+        message_dict["groupId"] = ObjectId(message_dict["groupId"])
+        members = await group_members.get(college_db, current_user["collegeId"], message_dict["groupId"])
+        if members is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+    message_dict["timestamp"] = get_current_time()
+    message_dict["isRead"] = False
+
+    persisted = await persist_message(college_db, message_dict)
+    try:
+        await persisted
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to store message")
+    return serialize_message(message_dict)
+
+MESSAGE_SORT_FIELDS = ["timestamp", "_id"]
+MESSAGE_SEARCH_LANGUAGE = os.getenv("MESSAGE_SEARCH_LANGUAGE", "english")  # "none" disables stemming and stop words
+_message_indexed_dbs = set()
+
+async def ensure_message_indexes(college_db, force: bool = False):
+    """Create the (..., timestamp, _id) message indexes keyset paging relies on, once per process."""
+    if college_db.name in _message_indexed_dbs and not force:
+        return
+    await college_db["messages"].create_index([("senderId", 1), ("receiverId", 1), ("timestamp", -1), ("_id", -1)])
+    await college_db["messages"].create_index([("receiverId", 1), ("timestamp", -1), ("_id", -1)])
+    await college_db["messages"].create_index([("groupId", 1), ("timestamp", -1), ("_id", -1)])
+    await college_db["messages"].create_index([("timestamp", 1), ("_id", 1)])  # archiver scans by age
+    await college_db["messages"].create_index([("content", "text")], default_language=MESSAGE_SEARCH_LANGUAGE)
+    await college_db["conversations"].create_index([("ownerId", 1), ("key", 1)], unique=True)
+    await college_db["conversations"].create_index([("ownerId", 1), ("lastTimestamp", -1), ("_id", -1)])
+    await college_db["conversations"].create_index([("groupId", 1)])
+    _message_indexed_dbs.add(college_db.name)
+
+# Message archive: monthly bucket collections (messages_archive_YYYY_MM) for old history
+MESSAGE_ARCHIVE_AFTER_DAYS = int(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "180"))  # 0 disables archiving
+MESSAGE_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("MESSAGE_ARCHIVE_INTERVAL_SECONDS", "3600"))
+MESSAGE_ARCHIVE_BATCH_SIZE = int(os.getenv("MESSAGE_ARCHIVE_BATCH_SIZE", "1000"))
+# A run stops at this share of the lease (one interval) so it always ends before another worker can take over
+MESSAGE_ARCHIVE_RUN_FRACTION = float(os.getenv("MESSAGE_ARCHIVE_RUN_FRACTION", "0.8"))
+_archive_indexed_buckets = set()
+
+def archive_month(timestamp: datetime):
+    """Bucket key for a message timestamp; stored timestamps are naive IST wall-clock (get_current_time)."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(IST)
+    return timestamp.strftime("%Y_%m")
+
+def archive_collection(month: str):
+    return f"messages_archive_{month}"
+
+async def archive_catalog(college_db):
+    """{"months": [...ascending], "archivedBefore": datetime} or None if nothing was ever archived."""
+    return await college_db["message_archive"].find_one({"_id": "catalog"})
+
+async def ensure_archive_bucket(college_db, month: str):
+    """Give a bucket the same read indexes as the hot collection and list it in the catalog."""
+    if (college_db.name, month) in _archive_indexed_buckets:
+        return
+    bucket = college_db[archive_collection(month)]
+    await bucket.create_index([("senderId", 1), ("receiverId", 1), ("timestamp", -1), ("_id", -1)])
+    await bucket.create_index([("receiverId", 1), ("timestamp", -1), ("_id", -1)])
+    await bucket.create_index([("groupId", 1), ("timestamp", -1), ("_id", -1)])
+    await bucket.create_index([("content", "text")], default_language=MESSAGE_SEARCH_LANGUAGE)
+    # Listed before anything is copied so readers never miss a bucket that holds data
+    await college_db["message_archive"].update_one(
+        {"_id": "catalog"}, {"$addToSet": {"months": month}}, upsert=True
+    )
+    _archive_indexed_buckets.add((college_db.name, month))
+
+async def archive_messages(college_db, cutoff: datetime, batch_size: int = MESSAGE_ARCHIVE_BATCH_SIZE,
+                           deadline: Optional[float] = None):
+    """
+    Move messages older than `cutoff` into their monthly buckets, oldest first, stopping between
+    batches once the event loop clock passes `deadline`.
+
+    Each batch is copied then deleted, so a crash at worst leaves copies that the next run skips
+    as duplicates, and a run cut short just leaves the rest for the next one. Moving in (timestamp, _id) order keeps everything archived older than
+    everything still hot, which is what lets readers walk hot -> newest bucket -> older buckets.
+    """
+    await ensure_message_indexes(college_db)
+    await college_db["message_archive"].update_one(
+        {"_id": "catalog"}, {"$max": {"archivedBefore": cutoff}, "$setOnInsert": {"months": []}}, upsert=True
+    )
+    moved = 0
+    sort = [(field, 1) for field in MESSAGE_SORT_FIELDS]
+    loop = asyncio.get_running_loop()
+    while deadline is None or loop.time() < deadline:
+        batch = await college_db.messages.find({"timestamp": {"$lt": cutoff}}).sort(sort).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            return moved
+        by_month: dict = {}
+        for message in batch:
+            by_month.setdefault(archive_month(message["timestamp"]), []).append(message)
+        for month, messages in by_month.items():
+            await ensure_archive_bucket(college_db, month)
+            try:
+                await college_db[archive_collection(month)].insert_many(messages, ordered=False)
+            except BulkWriteError as e:
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+        await college_db.messages.delete_many({"_id": {"$in": [message["_id"] for message in batch]}})
+        moved += len(batch)
+    return moved
+
+async def find_messages_page(college_db, query: dict, bound: Optional[list], direction: int, limit: int):
+    """
+    One keyset page in (timestamp, _id) order across the hot collection and the archive buckets.
+
+    Newest-first pages read the hot collection and only fall through to buckets (newest month
+    first) when it runs out; oldest-first pages that start inside the archive walk the buckets
+    forward and then continue into the hot collection.
+    """
+    sort = [(field, direction) for field in MESSAGE_SORT_FIELDS]
+    sources = ["messages"]
+    catalog = None
+    if direction > 0 and bound is not None:
+        catalog = await archive_catalog(college_db)
+        if catalog and catalog.get("archivedBefore") and bound[0] < catalog["archivedBefore"]:
+            start = archive_month(bound[0])
+            sources = [archive_collection(m) for m in sorted(catalog.get("months", [])) if m >= start] + sources
+
+    page, seen = [], set()
+    index = 0
+    while index < len(sources) and len(page) < limit:
+        scoped = {"$and": [query, keyset_filter(MESSAGE_SORT_FIELDS, bound, direction)]} if bound else query
+        wanted = limit - len(page)
+        rows = await college_db[sources[index]].find(scoped).sort(sort).limit(wanted).to_list(length=wanted)
+        for row in rows:
+            # A batch being archived can briefly exist in both places
+            if row["_id"] not in seen:
+                seen.add(row["_id"])
+                page.append(row)
+        if rows:
+            bound = [rows[-1]["timestamp"], rows[-1]["_id"]]
+        index += 1
+        if direction < 0 and index == len(sources) and len(page) < limit and catalog is None:
+            catalog = await archive_catalog(college_db) or {}
+            months = sorted(catalog.get("months", []), reverse=True)
+            if bound:
+                months = [m for m in months if m <= archive_month(bound[0])]
+            sources += [archive_collection(m) for m in months]
+    return page
+
+async def archived_sources(college_db, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """Bucket collections that may hold messages between `since` and `until` (open-ended when None)."""
+    catalog = await archive_catalog(college_db)
+    if not catalog:
+        return []
+    start = archive_month(since) if since else ""
+    end = archive_month(until) if until else "9999_99"
+    return [archive_collection(m) for m in catalog.get("months", []) if start <= m <= end]
+
+class MessageArchiver:
+    """Periodically moves old messages of every approved college into archive buckets."""
+
+    LEASE_ID = "message_archive"
+
+    def __init__(self, after_days: int = MESSAGE_ARCHIVE_AFTER_DAYS, interval_seconds: int = MESSAGE_ARCHIVE_INTERVAL_SECONDS):
+        self.after_days = after_days
+        self.interval_seconds = interval_seconds
+        self._task = None
+        self.runs = 0
+        self.cut_short = 0
+        self.archived = 0
+        self.last_run_at = None
+        self.last_error = None
+
+    def start(self):
+        if self.after_days > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Message archive run failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _acquire_lease(self):
+        """Only one API worker archives at a time; the lease expires if its holder dies."""
+        now = get_current_time()
+        try:
+            await client["SaaS_Management"].locks.update_one(
+                {"_id": self.LEASE_ID, "expiresAt": {"$lt": now}},
+                {"$set": {"owner": WORKER_ID, "expiresAt": now + timedelta(seconds=self.interval_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def run_once(self):
+        if not await self._acquire_lease():
+            return 0
+        # The lease runs for one interval from now; finishing inside it means no other worker can
+        # start archiving while this one is still moving batches
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.interval_seconds * MESSAGE_ARCHIVE_RUN_FRACTION
+        cutoff = get_current_time() - timedelta(days=self.after_days)
+        moved = 0
+        async for college in client["SaaS_Management"].colleges.find({"status": "approved"}, {"databaseName": 1}):
+            if loop.time() >= deadline:
+                break
+            moved += await archive_messages(client[college["databaseName"]], cutoff, deadline=deadline)
+        if loop.time() >= deadline:
+            print(f"Message archive run reached its deadline after {moved} messages; the next run continues")
+            self.cut_short += 1
+        self.runs += 1
+        self.archived += moved
+        self.last_run_at = get_current_time()
+        self.last_error = None
+        return moved
+
+    def stats(self):
+        return {
+            "enabled": self.after_days > 0,
+            "after_days": self.after_days,
+            "runs": self.runs,
+            "cut_short": self.cut_short,
+            "archived": self.archived,
+            "last_run_at": self.last_run_at,
+            "last_error": self.last_error,
+        }
+
+message_archiver = MessageArchiver()
+
+@app.on_event("startup")
+async def start_message_archiver():
+    message_archiver.start()
+
+@app.on_event("shutdown")
+async def stop_message_archiver():
+    message_archiver.stop()
+
+@app.get("/messages/")
+async def read_messages(
+    response: Response,
+    receiver_id: Optional[str] = None,
+    group_id: Optional[str] = None,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 100,
+    skip: int = 0,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Page through messages newest first using opaque keyset cursors on (timestamp, _id).
+    Pass the X-Next-Cursor header as `before` for older messages, or X-Prev-Cursor
+    as `after` for newer ones. Each page is an indexed range scan per collection it
+    touches; history older than MESSAGE_ARCHIVE_AFTER_DAYS is read from the archive buckets.
+    """
+    college_db = current_user["collegeDb"]
+    await ensure_message_indexes(college_db)
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    # skip is no longer supported; refuse it instead of silently serving the first page again
+    if skip:
+        raise HTTPException(
+            status_code=400,
+            detail="skip is no longer supported: pass the X-Next-Cursor header as before (or X-Prev-Cursor as after)"
+        )
+    for value in (receiver_id, group_id):
+        if value and not ObjectId.is_valid(value):
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+    limit = max(1, min(limit, 500))
+    
+    query = {}
+    if receiver_id:
+        query["$or"] = [
+            {"senderId": ObjectId(current_user["_id"]), "receiverId": ObjectId(receiver_id)},
+            {"senderId": ObjectId(receiver_id), "receiverId": ObjectId(current_user["_id"])}
+        ]
+    elif group_id:
+        query["groupId"] = ObjectId(group_id)
+    else:
+        query["$or"] = [
+            {"receiverId": ObjectId(current_user["_id"])},
+            {"senderId": ObjectId(current_user["_id"])}
+        ]
+
+    direction = 1 if after else -1
+    cursor_token = after or before
+    bound = decode_cursor(cursor_token, 2) if cursor_token else None
+
+    # Falls through to the monthly archive buckets once the hot collection runs out
+    page = await find_messages_page(college_db, query, bound, direction, limit)
+    if direction > 0:
+        page.reverse()
+
+    if page:
+        response.headers["X-Prev-Cursor"] = encode_cursor([page[0]["timestamp"], page[0]["_id"]])
+        if len(page) == limit or after:
+            response.headers["X-Next-Cursor"] = encode_cursor([page[-1]["timestamp"], page[-1]["_id"]])
+
+    messages = []
+    for message in page:
+        messages.append(serialize_message(message))
+        
+    return messages
+
+# Message search: Mongo text index on content, kept current by every insert into messages
+SEARCH_SORT_FIELDS = ["score", "_id"]
+
+async def search_source(collection, query: dict, bound: Optional[list], limit: int):
+    """Top `limit` text matches of one collection after `bound` in (score desc, _id desc) order."""
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if bound:
+        pipeline.append({"$match": keyset_filter(SEARCH_SORT_FIELDS, bound, -1)})
+    pipeline += [{"$sort": {"score": -1, "_id": -1}}, {"$limit": limit}]
+    return await collection.aggregate(pipeline).to_list(length=limit)
+
+@app.get("/messages/search")
+async def search_messages(
+    response: Response,
+    q: str,
+    receiver_id: Optional[str] = None,
+    group_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
+    limit: int = 20,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Full-text search over the caller's DMs and groups, best match first.
+    Pages are keyset-paginated on (score, _id); pass X-Next-Cursor back as `cursor`.
+    """
+    college_db = current_user["collegeDb"]
+    await ensure_message_indexes(college_db)
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    for value in (receiver_id, group_id):
+        if value and not ObjectId.is_valid(value):
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+    limit = max(1, min(limit, 100))
+    user_id = ObjectId(current_user["_id"])
+
+    # Scope to conversations the caller takes part in
+    if receiver_id:
+        scope = {"$or": [
+            {"senderId": user_id, "receiverId": ObjectId(receiver_id)},
+            {"senderId": ObjectId(receiver_id), "receiverId": user_id}
+        ]}
+    elif group_id:
+        members = await group_members.get(college_db, current_user["collegeId"], group_id)
+        if members is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        if str(user_id) not in members:
+            raise HTTPException(status_code=403, detail="Not a member of this group")
+        scope = {"groupId": ObjectId(group_id)}
+    else:
+        group_ids = [group["_id"] async for group in college_db.groups.find({"members": user_id}, {"_id": 1})]
+        scope = {"$or": [{"senderId": user_id}, {"receiverId": user_id}, {"groupId": {"$in": group_ids}}]}
+    query = {"$text": {"$search": q}, **scope}
+    bound = decode_cursor(cursor, 2) if cursor else None
+
+    sources = ["messages"]
+    if include_archived:
+        sources += await archived_sources(college_db)
+    # Each source returns its own best `limit`; merging those gives the global best `limit`
+    results = await asyncio.gather(*(search_source(college_db[source], query, bound, limit) for source in sources))
+    page = sorted(
+        (row for rows in results for row in rows),
+        key=lambda row: (row["score"], row["_id"]),
+        reverse=True
+    )[:limit]
+
+    if len(page) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor([page[-1]["score"], page[-1]["_id"]])
+    return [serialize_message(message) for message in page]
+
+# Conversation summaries: one document per (user, DM peer or group), maintained on write
+CONVERSATION_SORT_FIELDS = ["lastTimestamp", "_id"]
+_conversation_seeded_users = set()
+
+def conversation_updates(message: dict):
+    """The summary writes one stored message causes, for the sender and every recipient."""
+    sender_id = message["senderId"]
+    summary = {
+        "lastMessage": {
+            "_id": message["_id"],
+            "content": message["content"],
+            "senderId": sender_id
+        },
+        "lastTimestamp": message["timestamp"]
+    }
+
+    if message.get("receiverId"):
+        receiver_id = message["receiverId"]
+        return [
+            UpdateOne(
+                {"ownerId": sender_id, "key": f"dm:{receiver_id}"},
+                {"$set": {**summary, "peerId": receiver_id}, "$setOnInsert": {"unreadCount": 0}},
+                upsert=True
+            ),
+            UpdateOne(
+                {"ownerId": receiver_id, "key": f"dm:{sender_id}"},
+                {"$set": {**summary, "peerId": sender_id}, "$inc": {"unreadCount": 1}},
+                upsert=True
+            ),
+        ]
+    if message.get("groupId"):
+        group_id = message["groupId"]
+        return [
+            UpdateMany(
+                {"groupId": group_id, "ownerId": {"$ne": sender_id}},
+                {"$set": summary, "$inc": {"unreadCount": 1}}
+            ),
+            UpdateOne(
+                {"ownerId": sender_id, "key": f"group:{group_id}"},
+                {"$set": {**summary, "groupId": group_id}, "$setOnInsert": {"unreadCount": 0}},
+                upsert=True
+            ),
+        ]
+    return []
+
+async def record_conversation_messages(college_db, messages: list):
+    """Fold stored messages into conversation summaries with one ordered bulk write."""
+    await ensure_message_indexes(college_db)
+    updates = [update for message in messages for update in conversation_updates(message)]
+    if updates:
+        # Ordered so the newest message of a batch ends up as lastMessage
+        await college_db["conversations"].bulk_write(updates, ordered=True)
+
+async def record_conversation_message(college_db, message: dict):
+    """Fold a stored message into the sender's and recipients' conversation summaries."""
+    await record_conversation_messages(college_db, [message])
+
+async def seed_group_conversations(college_db, group_id: ObjectId, member_ids: list, created_at: datetime):
+    """Make sure every member has a summary document for the group so fan-out updates reach them."""
+    if not member_ids:
+        return
+    await ensure_message_indexes(college_db)
+    await college_db["conversations"].bulk_write([
+        UpdateOne(
+            {"ownerId": ObjectId(member_id), "key": f"group:{group_id}"},
+            {"$setOnInsert": {"groupId": group_id, "unreadCount": 0, "lastTimestamp": created_at}},
+            upsert=True
+        )
+        for member_id in {str(member_id) for member_id in member_ids}
+    ], ordered=False)
+
+@app.get("/conversations")
+async def read_conversations(
+    response: Response,
+    before: Optional[str] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """Chat list for the current user, most recent conversation first."""
+    college_db = current_user["collegeDb"]
+    user_id = ObjectId(current_user["_id"])
+    limit = max(1, min(limit, 200))
+
+    # Groups created before summaries existed are seeded once per user per process
+    seed_key = (college_db.name, user_id)
+    if seed_key not in _conversation_seeded_users:
+        async for group in college_db.groups.find({"members": user_id}, {"createdAt": 1}):
+            await seed_group_conversations(college_db, group["_id"], [user_id], group.get("createdAt") or get_current_time())
+        _conversation_seeded_users.add(seed_key)
+
+    query = {"ownerId": user_id}
+    if before:
+        query.update(keyset_filter(CONVERSATION_SORT_FIELDS, decode_cursor(before, 2), -1))
+    sort = [(field, -1) for field in CONVERSATION_SORT_FIELDS]
+    page = await college_db["conversations"].find(query).sort(sort).limit(limit).to_list(length=limit)
+    if len(page) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor([page[-1].get("lastTimestamp"), page[-1]["_id"]])
+
+    conversations = []
+    for conversation in page:
+        last_message = conversation.get("lastMessage")
+        if last_message:
+            last_message["_id"] = str(last_message["_id"])
+            last_message["senderId"] = str(last_message["senderId"])
+        conversations.append({
+            "_id": str(conversation["_id"]),
+            "type": "group" if conversation.get("groupId") else "direct",
+            "peerId": str(conversation["peerId"]) if conversation.get("peerId") else None,
+            "groupId": str(conversation["groupId"]) if conversation.get("groupId") else None,
+            "lastMessage": last_message,
+            "lastTimestamp": conversation.get("lastTimestamp"),
+            "unreadCount": conversation.get("unreadCount", 0)
+        })
+    return conversations
+
+# Read positions: mark a conversation read up to a (timestamp, _id) cursor
+async def read_position(college_db, receipt: dict):
+    """Resolve a receipt's upTo/cursor to a (timestamp, _id) pair; None means "everything so far"."""
+    if receipt.get("cursor"):
+        return decode_cursor(receipt["cursor"], 2)
+    if receipt.get("upTo"):
+        if not ObjectId.is_valid(str(receipt["upTo"])):
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+        message = None
+        for source in ["messages"] + await archived_sources(college_db):
+            message = await college_db[source].find_one({"_id": ObjectId(str(receipt["upTo"]))}, {"timestamp": 1})
+            if message:
+                break
+        if not message:
+            raise HTTPException(status_code=404, detail="Message not found")
+        return [message["timestamp"], message["_id"]]
+    return None
+
+def read_event(reader_id, message_ids=None, up_to=None) -> str:
+    """
+    The "read" frame sent to the author of DMs that were just read. One schema for every path:
+
+        {"type": "read", "data": {
+            "readerId": str,                  # who read them (the other side of the DM)
+            "messageIds": [str] | null,       # exactly these messages were read
+            "upTo": str | null                # everything up to this message cursor was read
+        }}
+
+    When both messageIds and upTo are null the whole conversation was read.
+    """
+    return json.dumps({"type": "read", "data": {
+        "readerId": str(reader_id),
+        "messageIds": [str(message_id) for message_id in message_ids] if message_ids is not None else None,
+        "upTo": encode_cursor(up_to) if up_to else None
+    }})
+
+async def take_unread(college_db, owner_id: ObjectId, key: str, count: int):
+    """Take `count` off a conversation's unread counter in one atomic update, never below zero."""
+    # A summary lagging behind its messages (write-behind) must not go negative
+    await college_db["conversations"].update_one(
+        {"ownerId": owner_id, "key": key},
+        [{"$set": {"unreadCount": {"$max": [0, {"$subtract": [{"$ifNull": ["$unreadCount", 0]}, count]}]}}}]
+    )
+
+async def mark_conversation_read(college_db, college_id: str, reader_id: ObjectId, receipt: dict):
+    """
+    Mark a DM or group read up to a position and keep the reader's unread counter exact.
+
+    DMs flip isRead with a single update_many bounded by (timestamp, _id) and take exactly the
+    modified count off the counter. Group messages are shared between members, so groups keep
+    a per-user read position that only moves forward, and the counter is recounted from it.
+    """
+    peer_id, group_id = receipt.get("peerId"), receipt.get("groupId")
+    if bool(peer_id) == bool(group_id):
+        raise HTTPException(status_code=400, detail="Provide either peerId or groupId")
+    if not ObjectId.is_valid(str(peer_id or group_id)):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+    await ensure_message_indexes(college_db)
+    position = await read_position(college_db, receipt)
+    bound = keyset_upto(MESSAGE_SORT_FIELDS, position) if position else {}
+    conversations = college_db["conversations"]
+
+    if peer_id:
+        peer_id = ObjectId(str(peer_id))
+        key = f"dm:{peer_id}"
+        marked = 0
+        for source in ["messages"] + await archived_sources(college_db, until=position[0] if position else None):
+            result = await college_db[source].update_many(
+                {"senderId": peer_id, "receiverId": reader_id, "isRead": False, **bound},
+                {"$set": {"isRead": True}}
+            )
+            marked += result.modified_count
+        if marked:
+            await take_unread(college_db, reader_id, key, marked)
+            await manager.send_personal_message(read_event(reader_id, up_to=position), str(peer_id), college_id)
+    else:
+        group_id = ObjectId(str(group_id))
+        key = f"group:{group_id}"
+        members = await group_members.get(college_db, college_id, group_id)
+        if members is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        if str(reader_id) not in members:
+            raise HTTPException(status_code=403, detail="Not a member of this group")
+        if position is None:
+            latest = await college_db.messages.find_one(
+                {"groupId": group_id}, {"timestamp": 1}, sort=[(field, -1) for field in MESSAGE_SORT_FIELDS]
+            )
+            if latest:
+                position = [latest["timestamp"], latest["_id"]]
+        marked = 0
+        if position:
+            before = await conversations.find_one({"ownerId": reader_id, "key": key}, {"unreadCount": 1})
+            moved = await conversations.update_one(
+                {"ownerId": reader_id, "key": key, "$or": [
+                    {"readTimestamp": {"$exists": False}},
+                    keyset_filter(["readTimestamp", "readId"], position, -1)
+                ]},
+                {"$set": {"readTimestamp": position[0], "readId": position[1]}}
+            )
+            if not moved.matched_count:
+                existing = await conversations.find_one({"ownerId": reader_id, "key": key}, {"readTimestamp": 1, "readId": 1})
+                if existing is None:
+                    await conversations.update_one(
+                        {"ownerId": reader_id, "key": key},
+                        {"$setOnInsert": {"groupId": group_id, "readTimestamp": position[0], "readId": position[1]}},
+                        upsert=True
+                    )
+                else:
+                    # Already read further; a stale receipt never moves the position back
+                    position = [existing["readTimestamp"], existing["readId"]]
+            unread = 0
+            for source in ["messages"] + await archived_sources(college_db, since=position[0]):
+                unread += await college_db[source].count_documents({
+                    "groupId": group_id, "senderId": {"$ne": reader_id},
+                    **keyset_filter(MESSAGE_SORT_FIELDS, position, 1)
+                })
+            await conversations.update_one(
+                {"ownerId": reader_id, "key": key, "readTimestamp": position[0], "readId": position[1]},
+                {"$set": {"unreadCount": unread}}
+            )
+            marked = max(0, (before or {}).get("unreadCount", 0) - unread)
+
+    summary = await conversations.find_one({"ownerId": reader_id, "key": key}, {"unreadCount": 1})
+    unread_count = summary.get("unreadCount", 0) if summary else 0
+    # Keep the reader's other tabs and devices in sync
+    await manager.send_personal_message(json.dumps({"type": "conversation_read", "data": {
+        "key": key, "unreadCount": unread_count
+    }}), str(reader_id), college_id, coalesce_key=f"conversation_read:{key}")
+    return {"key": key, "marked": marked, "unreadCount": unread_count}
+
+@app.post("/conversations/read")
+async def mark_read(receipt: ReadReceipt, current_user: dict = Depends(get_current_user)):
+    """Mark a conversation read up to `upTo` (a message id) or `cursor` (an X-*-Cursor value), or entirely."""
+    return await mark_conversation_read(
+        current_user["collegeDb"], current_user["collegeId"], ObjectId(current_user["_id"]), receipt.dict()
+    )
+
+@app.post("/groups/")
+async def create_group(group: GroupCreate, current_user: dict = Depends(get_current_user)):
+    # Only allow admins to create groups
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Only admins can create groups")
+        
+    college_db = current_user["collegeDb"]
+
+    group_dict = group.dict()
+    group_dict["createdAt"] = get_current_time()
+    group_dict["createdBy"] = ObjectId(current_user["_id"])
+    group_dict["admins"] = [ObjectId(current_user["_id"])]
+    group_dict["members"] = [ObjectId(current_user["_id"])] + [ObjectId(m) for m in group_dict["members"]]
+
+    result = await college_db.groups.insert_one(group_dict)
+    group_members.put(current_user["collegeId"], result.inserted_id, group_dict["members"])
+    await seed_group_conversations(college_db, result.inserted_id, group_dict["members"], group_dict["createdAt"])
+    new_group = dict(group_dict)
+    new_group["_id"] = str(result.inserted_id)
+    new_group["createdBy"] = str(new_group["createdBy"])
+    new_group["admins"] = [str(a) for a in new_group["admins"]]
+    new_group["members"] = [str(m) for m in new_group["members"]]
+    return new_group
+
+@app.get("/groups/")
 async def read_groups(skip: int = 0, limit: int = 100, current_user: dict = Depends(get_current_user)):
     college_db = current_user["collegeDb"]
     groups = []
@@ -1004,10 +3862,153 @@ async def add_group_member(group_id: str, member_id: str, current_user: dict = D
         {"_id": ObjectId(group_id)},
         {"$addToSet": {"members": ObjectId(member_id)}}
     )
+    manager.group_member_added(current_user["collegeId"], group_id, member_id)
+    await seed_group_conversations(college_db, group["_id"], [member_id], get_current_time())
     return {"status": "success", "message": "Member added to group"}
     
+# Batched WebSocket frames: {"type": "batch", "batchId": ..., "ops": [...]}
+WS_BATCH_MAX_OPS = int(os.getenv("WS_BATCH_MAX_OPS", "100"))
+
+def _object_ids(values):
+    """ObjectIds for a list of id strings, or None if any of them is malformed."""
+    if not isinstance(values, list) or not all(ObjectId.is_valid(str(value)) for value in values):
+        return None
+    return [ObjectId(str(value)) for value in values]
+
+async def mark_messages_read(college_db, reader_id: ObjectId, message_ids: list):
+    """
+    Flip isRead on DMs addressed to the reader and decrement their unread counters.
+    Returns {senderId: [message ids actually flipped]}.
+    """
+    unread = college_db.messages.find(
+        {"_id": {"$in": message_ids}, "receiverId": reader_id, "isRead": False},
+        {"senderId": 1}
+    )
+    by_sender: dict = {}
+    async for message in unread:
+        by_sender.setdefault(message["senderId"], []).append(message["_id"])
+
+    flipped = {}
+    for sender_id, ids in by_sender.items():
+        result = await college_db.messages.update_many(
+            {"_id": {"$in": ids}, "isRead": False},
+            {"$set": {"isRead": True}}
+        )
+        # Only what this call flipped is taken off the counter, so concurrent receipts don't double count
+        if result.modified_count:
+            await take_unread(college_db, reader_id, f"dm:{sender_id}", result.modified_count)
+            flipped[sender_id] = ids
+    return flipped
+
+async def handle_batch_frame(frame: dict, user_id: str, sender_name: str, college_id: str, college_db):
+    """
+    Run the ops of a batch frame: messages and group messages are stored with one insert_many,
+    read receipts with one update_many per sender, and typing signals are only relayed.
+    Messages are delivered only once stored, and the sender gets a single batch_ack
+    listing the outcome of every op in order.
+    """
+    ops = frame.get("ops")
+    batch_id = frame.get("batchId")
+    if not isinstance(ops, list) or not ops or len(ops) > WS_BATCH_MAX_OPS:
+        await manager.send_personal_message(json.dumps({"type": "batch_ack", "data": {
+            "batchId": batch_id, "status": "rejected",
+            "detail": f"A batch must carry between 1 and {WS_BATCH_MAX_OPS} ops"
+        }}), user_id, college_id)
+        return
+
+    sender_id = ObjectId(user_id)
+    results = [None] * len(ops)
+    messages, message_indexes, read_ids, read_indexes = [], [], [], []
+    for index, op in enumerate(ops):
+        op = op if isinstance(op, dict) else {}
+        kind = op.get("type")
+        results[index] = {"index": index, "clientId": op.get("clientId")}
+        if kind == "message" and ObjectId.is_valid(str(op.get("receiverId"))) and op.get("content"):
+            messages.append({
+                "content": op["content"],
+                "senderId": sender_id,
+                "receiverId": ObjectId(op["receiverId"]),
+                "timestamp": get_current_time(),
+                "isRead": False
+            })
+            message_indexes.append(index)
+        elif kind == "group_message" and ObjectId.is_valid(str(op.get("groupId"))) and op.get("content"):
+            messages.append({
+                "content": op["content"],
+                "senderId": sender_id,
+                "groupId": ObjectId(op["groupId"]),
+                "timestamp": get_current_time(),
+                "isRead": False
+            })
+            message_indexes.append(index)
+        elif kind == "read" and _object_ids(op.get("messageIds")) is not None:
+            read_ids.extend(_object_ids(op["messageIds"]))
+            read_indexes.append(index)
+        elif kind == "read" and (op.get("peerId") or op.get("groupId")):
+            try:
+                results[index].update(await mark_conversation_read(college_db, college_id, sender_id, op))
+                results[index]["status"] = "read"
+            except HTTPException as e:
+                results[index].update({"status": "invalid", "detail": e.detail})
+        elif kind == "typing" and (ObjectId.is_valid(str(op.get("receiverId"))) or ObjectId.is_valid(str(op.get("groupId")))):
+            target = {"receiverId": op["receiverId"]} if op.get("receiverId") else {"groupId": op["groupId"]}
+            typing = json.dumps({"type": "typing", "data": {"senderId": user_id, **target}})
+            coalesce_key = f"typing:{user_id}:{op.get('receiverId') or op.get('groupId')}"
+            if op.get("receiverId"):
+                await manager.send_personal_message(typing, op["receiverId"], college_id, coalesce_key=coalesce_key)
+            else:
+                await manager.broadcast_to_group(typing, op["groupId"], college_id, college_db, exclude_user_id=user_id)
+            results[index]["status"] = "sent"
+        else:
+            results[index]["status"] = "invalid"
+
+    persisted = await persist_messages(college_db, messages)
+
+    if read_ids:
+        flipped = await mark_messages_read(college_db, sender_id, read_ids)
+        for message_sender, ids in flipped.items():
+            await manager.send_personal_message(read_event(user_id, message_ids=ids), str(message_sender), college_id)
+        read_count = sum(len(ids) for ids in flipped.values())
+        for index in read_indexes:
+            results[index]["status"] = "read"
+        results[read_indexes[0]]["count"] = read_count
+
+    spawn_background(acknowledge_batch(
+        batch_id, results, message_indexes, messages, persisted, user_id, sender_name, college_id, college_db
+    ))
+
+async def acknowledge_batch(batch_id, results: list, message_indexes: list, messages: list, persisted: list,
+                            user_id: str, sender_name: str, college_id: str, college_db):
+    """
+    Fan out the batch's messages once they are durable, then send one combined ack.
+    A message whose insert failed is never delivered; its sender sees "failed" in the ack.
+    """
+    outcomes = await asyncio.gather(*persisted, return_exceptions=True)
+    for index, message, outcome in zip(message_indexes, messages, outcomes):
+        results[index]["_id"] = str(message["_id"])
+        if isinstance(outcome, Exception):
+            print(f"Error persisting message {message['_id']}: {outcome}")
+            results[index]["status"] = "failed"
+            continue
+        results[index]["status"] = "persisted"
+        if message.get("receiverId"):
+            frame_text = json.dumps({"type": "message", "data": websocket_message_payload(message)})
+            await manager.send_personal_message(frame_text, str(message["receiverId"]), college_id)
+            await manager.send_personal_message(frame_text, user_id, college_id)
+        else:
+            frame_text = json.dumps({
+                "type": "group_message",
+                "data": websocket_message_payload(message, senderName=sender_name)
+            })
+            # Includes the sender, like single group_message frames: the client renders its own messages from the echo
+            await manager.broadcast_to_group(frame_text, str(message["groupId"]), college_id, college_db)
+    await manager.send_personal_message(json.dumps({"type": "batch_ack", "data": {
+        "batchId": batch_id, "status": "done", "results": results
+    }}), user_id, college_id)
+
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
+    connection = None
     try:
         # Extract token from cookies
         cookies = websocket.cookies
@@ -1025,22 +4026,51 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             return
 
         # Get the college database
-        SaaS_Management = client["SaaS_Management"]
-        college = await SaaS_Management.colleges.find_one({"collegeId": college_id})
+        college = await tenant_registry.get(college_id)
         if not college:
             await websocket.close(code=1008)
             return
         
         college_db = client[college["databaseName"]]
         
-        await manager.connect(websocket, user_id, college_id)
+        connection = await manager.connect(websocket, user_id, college_id)
+        if connection is None:
+            return
+        if presence.connected(college_id, user_id, payload.get("role")):
+            await presence.announce_online(college_id, user_id)
         try:
             while True:
-                data = await websocket.receive_text()
+                try:
+                    # Clients must send something (at least a pong) within one ping interval plus grace
+                    data = await asyncio.wait_for(websocket.receive_text(), timeout=WS_IDLE_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    if not connection.closed:
+                        manager.reaped += 1
+                    connection.close(code=1001, reason="Heartbeat timeout")
+                    raise WebSocketDisconnect(code=1001)
+                connection.touch()
+                presence.seen(college_id, user_id, payload.get("role"))
                 message_data = json.loads(data)
                 
                 # Handle different message types
-                if message_data["type"] == "message":
+                if message_data["type"] == "pong":
+                    continue
+
+                elif message_data["type"] == "ping":
+                    connection.enqueue(PONG_FRAME, coalesce_key="pong")
+
+                elif message_data["type"] == "read":
+                    try:
+                        await mark_conversation_read(college_db, college_id, ObjectId(user_id), message_data)
+                    except HTTPException as e:
+                        await manager.send_personal_message(json.dumps({"type": "error", "data": {
+                            "type": "read", "detail": e.detail
+                        }}), user_id, college_id)
+
+                elif message_data["type"] == "batch":
+                    await handle_batch_frame(message_data, user_id, payload.get("name"), college_id, college_db)
+
+                elif message_data["type"] == "message":
                     # Save to database
                     message = {
                         "content": message_data["content"],
@@ -1049,39 +4079,22 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                         "timestamp": get_current_time(),
                         "isRead": False
                     }
-                    result = await college_db.messages.insert_one(message)
-                    
-                    # Get the inserted message with string IDs for sending
-                    new_message = await college_db.messages.find_one({"_id": result.inserted_id})
-                    print(new_message["timestamp"].astimezone(pytz.timezone("Asia/Kolkata")).isoformat())
-                    message_to_send = {
-                        "_id": str(new_message["_id"]),
-                        "content": new_message["content"],
-                        "senderId": str(new_message["senderId"]),
-                        "receiverId": str(new_message["receiverId"]),
-                        "timestamp": new_message["timestamp"].astimezone(pytz.timezone("Asia/Kolkata")).isoformat(),
-                        "isRead": new_message["isRead"]
-                    }
-                    
+                    persisted = await persist_message(college_db, message)
+
+                    # Build the outgoing frame from the stored document; no re-read needed
+                    frame = json.dumps({
+                        "type": "message",
+                        "data": websocket_message_payload(message)
+                    })
+
                     # Broadcast to receiver
-                    await manager.send_personal_message(
-                        json.dumps({
-                            "type": "message",
-                            "data": message_to_send
-                        }),
-                        message_data["receiverId"],
-                        college_id
-                    )
+                    await manager.send_personal_message(frame, message_data["receiverId"], college_id)
                     
                     # Also send back to sender for UI update
-                    await manager.send_personal_message(
-                        json.dumps({
-                            "type": "message",
-                            "data": message_to_send
-                        }),
-                        user_id,
-                        college_id
-                    )
+                    await manager.send_personal_message(frame, user_id, college_id)
+                    spawn_background(acknowledge_message(
+                        persisted, message["_id"], message_data.get("clientId"), user_id, college_id
+                    ))
 
                 elif message_data["type"] == "group_message":
                     # Verify senderName matches JWT payload (optional security check)
@@ -1096,20 +4109,10 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                         "timestamp": get_current_time(),
                         "isRead": False
                     }
-                    result = await college_db.messages.insert_one(message)
-
-                    # Get the inserted message with string IDs for sending
-                    new_message = await college_db.messages.find_one({"_id": result.inserted_id})
-                    print(new_message["timestamp"].astimezone(pytz.timezone("Asia/Kolkata")).isoformat())
-                    message_to_send = {
-                        "_id": str(new_message["_id"]),
-                        "content": new_message["content"],
-                        "senderId": str(new_message["senderId"]),
-                        "groupId": str(new_message["groupId"]),
-                        "senderName": message_data.get("senderName", "Unknown"),
-                        "timestamp": new_message["timestamp"].astimezone(pytz.timezone("Asia/Kolkata")).isoformat(),
-                        "isRead": new_message["isRead"]
-                    }
+                    persisted = await persist_message(college_db, message)
+                    message_to_send = websocket_message_payload(
+                        message, senderName=message_data.get("senderName", "Unknown")
+                    )
 
                     # Broadcast to group members
                     await manager.broadcast_to_group(
@@ -1121,37 +4124,25 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                         college_id,
                         college_db
                     )
+                    spawn_background(acknowledge_message(
+                        persisted, message["_id"], message_data.get("clientId"), user_id, college_id
+                    ))
 
         except WebSocketDisconnect:
-            manager.disconnect(user_id, college_id)
-            # Update user status to offline
-            role = payload.get("role")
-            if role:
-                await college_db[role].update_one(
-                    {"_id": ObjectId(user_id)},
-                    {"$set": {"status": "offline", "lastSeen": get_current_time()}}
-                )
-                
-                # Notify others about user going offline
-                for connection_key in list(manager.active_connections.keys()):
-                    if connection_key.startswith(f"{college_id}:") and not connection_key.endswith(f":{user_id}"):
-                        try:
-                            await manager.active_connections[connection_key].send_text(
-                                json.dumps({
-                                    "type": "user_offline",
-                                    "userId": user_id
-                                })
-                            )
-                        except Exception as e:
-                            print(f"Error notifying about offline status: {e}")
-                            
+            connection.close()
+            # Goes offline (and tells the college) only if no tab/device reconnects within the grace period
+            presence.disconnected(college_id, user_id, payload.get("role"))
+
     except JWTError:
         await websocket.close(code=1008)
     except Exception as e:
         print(f"WebSocket error: {e}")
         try:
-            manager.disconnect(user_id, college_id)
-            await websocket.close(code=1011)
+            if connection:
+                connection.close(code=1011)
+                presence.disconnected(college_id, user_id, payload.get("role"))
+            else:
+                await websocket.close(code=1011)
         except:
             pass
 
@@ -1191,6 +4182,7 @@ async def approve_college(college_id: str, current_user: dict = Depends(get_curr
         raise HTTPException(status_code=400, detail="College has been rejected and cannot be approved.")
     # Update status to approved
     await SaaS_Management.colleges.update_one({"collegeId": college_id}, {"$set": {"status": "approved"}})
+    tenant_registry.invalidate(college_id)
 
     try:
         collegedb = client[college["databaseName"]]
@@ -1202,9 +4194,11 @@ async def approve_college(college_id: str, current_user: dict = Depends(get_curr
                 print(f"Creating collection {coll} in {college['databaseName']}")
                 await collegedb.create_collection(coll)
 
-        await collegedb["messages"].create_index([("senderId", 1), ("receiverId", 1), ("timestamp", -1)])
-        await collegedb["messages"].create_index([("groupId", 1), ("timestamp", -1)])
+        await ensure_message_indexes(collegedb, force=True)
         await collegedb["groups"].create_index([("members", 1)])
+        # Lets bulk imports rely on duplicate-key errors instead of per-row lookups
+        await collegedb["Student"].create_index([("email", 1)], unique=True)
+        await collegedb["Alumni"].create_index([("email", 1)], unique=True)
         print(f"All collections created successfully for {college['databaseName']}")
     except Exception as e:
         print(f"Error creating collections: {e}")
@@ -1229,6 +4223,7 @@ async def reject_college(college_id: str, current_user: dict = Depends(get_curre
         raise HTTPException(status_code=400, detail="College has been approved and cannot be rejected.")
     # Update status to rejected
     await SaaS_Management.colleges.update_one({"collegeId": college_id}, {"$set": {"status": "rejected"}})
+    tenant_registry.invalidate(college_id)
     return {"message": "College rejected successfully"}
 
 class CollegeLogin(BaseModel):
@@ -1244,8 +4239,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60  # or your desired value
 
 @app.post("/college-login")
 async def college_login(credentials: CollegeLogin):
-    SaaS_Management = client["SaaS_Management"]
-    college = await SaaS_Management["colleges"].find_one({"collegeId": credentials.collegeId})
+    college = await tenant_registry.get(credentials.collegeId)
     
     if not college:
         raise HTTPException(status_code=404, detail="College not found")
@@ -1253,13 +4247,10 @@ async def college_login(credentials: CollegeLogin):
     college_db = client[college["databaseName"]]
     admin = await college_db["Admin"].find_one({"name": credentials.collegeId})
     
-    if not admin or not verify_password(credentials.password, admin["password"]):
+    if not admin or not await password_hasher.verify(credentials.password, admin["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    await college_db["Admin"].update_one(
-        {"_id": admin["_id"]},
-        {"$set": {"lastSeen": get_current_time(), "status": "online"}}
-    )
+    presence.seen(admin["collegeId"], str(admin["_id"]), "Admin", status="online")
 
     # Create JWT payload
     user_info = {
@@ -1342,11 +4333,13 @@ async def add_admin(
     admin_dict["collegeId"] = college_id
     admin_dict["createdAt"] = get_current_time()
     admin_dict["collegeStatus"] = "approved"
-    admin_dict["password"] = get_password_hash(admin_dict["password"])
+    admin_dict["password"] = await password_hasher.hash(admin_dict["password"])
 
     result = await college_db["Admin"].insert_one(admin_dict)
-    new_admin = await college_db["Admin"].find_one({"_id": result.inserted_id})
-    new_admin["_id"] = str(new_admin["_id"])
+    await user_roles.add(college_db, college_id, [result.inserted_id], "Admin")
+    typeahead_index.patch(college_id, "Admin", {**admin_dict, "_id": result.inserted_id})
+    new_admin = dict(admin_dict)
+    new_admin["_id"] = str(result.inserted_id)
     del new_admin["password"]
     return {"status": "success", "admin": new_admin}
 
@@ -1378,6 +4371,9 @@ async def remove_admin(
 
     # Remove the admin
     result = await college_db["Admin"].delete_one({"_id": ObjectId(admin_id)})
+    principal_cache.invalidate_ids(current_user["collegeId"], [admin_id])
+    await user_roles.remove(college_db, current_user["collegeId"], [admin_id])
+    typeahead_index.remove(current_user["collegeId"], [admin_id])
     if result.deleted_count == 0:
         raise HTTPException(status_code=500, detail="Failed to remove admin.")
 
@@ -1404,6 +4400,11 @@ async def remove_students(
 
     object_ids = [ObjectId(sid) for sid in student_ids]
     result = await college_db["Student"].delete_many({"_id": {"$in": object_ids}})
+    principal_cache.invalidate_ids(current_user["collegeId"], student_ids)
+    await user_roles.remove(college_db, current_user["collegeId"], student_ids)
+    directory_index.remove(current_user["collegeId"], student_ids)
+    mentor_index.remove(current_user["collegeId"], student_ids)
+    typeahead_index.remove(current_user["collegeId"], student_ids)
     return {
         "status": "success",
         "deleted_count": result.deleted_count,
@@ -1431,6 +4432,11 @@ async def remove_alumni(
 
     object_ids = [ObjectId(aid) for aid in alumni_ids]
     result = await college_db["Alumni"].delete_many({"_id": {"$in": object_ids}})
+    principal_cache.invalidate_ids(current_user["collegeId"], alumni_ids)
+    await user_roles.remove(college_db, current_user["collegeId"], alumni_ids)
+    directory_index.remove(current_user["collegeId"], alumni_ids)
+    mentor_index.remove(current_user["collegeId"], alumni_ids)
+    typeahead_index.remove(current_user["collegeId"], alumni_ids)
     return {
         "status": "success",
         "deleted_count": result.deleted_count,
@@ -1438,6 +4444,268 @@ async def remove_alumni(
     }
 
 
+# Bulk registration pipeline
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "500"))
+
+# Required spreadsheet columns per role, after lower-casing the headers
+ROSTER_COLUMNS = {
+    "Student": ["rollno", "email"],
+    "Alumni": ["name", "prn", "email"],
+}
+
+async def bulk_register_users(college_db, college_id: str, role: str, rows: List[dict], bump_meta: bool = True, on_passwords=None):
+    """
+    Register a roster of Student or Alumni rows in batches.
+
+    Emails are checked with a single $in query, passwords are hashed in parallel on the
+    hashing pool and documents are written with chunked unordered insert_many calls.
+    `on_passwords`, if given, is awaited with {row index: password} before each insert so
+    callers can persist credentials that would otherwise be lost if they crash mid-chunk.
+    Returns the generated passwords and a status per input row, plus throughput stats.
+    """
+    started = time.perf_counter()
+    schema = StudentSchema if role == "Student" else AlumniSchema
+    passwords = [""] * len(rows)
+    statuses = ["Already Exists"] * len(rows)
+
+    emails = [str(row["email"]).strip().lower() for row in rows]
+    existing = set()
+    async for doc in college_db[role].find({"email": {"$in": list(set(emails))}}, {"email": 1}):
+        existing.add(doc["email"])
+
+    # Keep the first occurrence of each new email; repeats in the file count as existing
+    pending = []
+    for idx, email in enumerate(emails):
+        if email in existing:
+            continue
+        existing.add(email)
+        pending.append(idx)
+
+    created_count = 0
+    for offset in range(0, len(pending), BULK_INSERT_CHUNK_SIZE):
+        chunk = pending[offset:offset + BULK_INSERT_CHUNK_SIZE]
+        chunk_passwords = [str(random.randint(100000, 999999)) for _ in chunk]
+        hashes = await password_hasher.hash_many(chunk_passwords)
+
+        docs = []
+        for idx, hashed in zip(chunk, hashes):
+            user_obj = schema(
+                **{**rows[idx], "email": emails[idx]},
+                role=role,
+                collegeId=college_id,
+                status="offline",
+                lastSeen=None,
+                createdAt=get_current_time()
+            )
+            user_dict = user_obj.dict()
+            user_dict["password"] = hashed
+            docs.append(user_dict)
+
+        if on_passwords is not None:
+            await on_passwords(dict(zip(chunk, chunk_passwords)))
+        failed = {}
+        try:
+            await college_db[role].insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = "Already Exists" if error.get("code") == 11000 else "Failed"
+
+        inserted = [doc for position, doc in enumerate(docs) if position not in failed]
+        await user_roles.add(college_db, college_id, [doc["_id"] for doc in inserted], role)
+        directory_index.patch_many(college_id, role, inserted)
+        mentor_index.patch_many(college_id, role, inserted)
+        typeahead_index.patch_many(college_id, role, inserted)
+        for position, (idx, password) in enumerate(zip(chunk, chunk_passwords)):
+            if position in failed:
+                statuses[idx] = failed[position]
+                continue
+            passwords[idx] = password
+            statuses[idx] = "Created"
+            created_count += 1
+
+    # Update meta collection once with the count of newly created users
+    if bump_meta and created_count > 0:
+        await update_college_meta(college_db, "student" if role == "Student" else "alumni", created_count)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "rows": len(rows),
+        "created": created_count,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(len(rows) / elapsed, 1) if elapsed > 0 else float(len(rows)),
+    }
+    print(f"Bulk registered {role} for {college_id}: {stats}")
+    return passwords, statuses, stats
+
+def roster_row(role: str, record: dict):
+    """Map a normalized spreadsheet record onto the fields of the user schema."""
+    if role == "Student":
+        rollno = str(record['rollno']).strip()
+        return {"name": rollno, "rollno": rollno, "email": record['email']}
+    return {
+        "name": str(record['name']).strip(),
+        "prn": str(record['prn']).strip(),
+        "email": record['email']
+    }
+
+# Streaming roster ingestion
+ROSTER_BATCH_SIZE = int(os.getenv("ROSTER_BATCH_SIZE", "500"))
+ROSTER_EXTENSIONS = (".xlsx", ".xlsm", ".csv")
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def roster_extension(filename: Optional[str]):
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext == ".xls":
+        raise HTTPException(status_code=400, detail="Legacy .xls workbooks are not supported. Save the file as .xlsx or .csv and upload it again.")
+    if ext not in ROSTER_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Upload must be an .xlsx or .csv file.")
+    return ext
+
+async def spool_upload(file: UploadFile, path: Optional[str] = None):
+    """Copy an upload to disk in fixed-size chunks and return the file path."""
+    ext = roster_extension(file.filename)
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=ext)
+        buffer = os.fdopen(fd, "wb")
+    else:
+        buffer = open(path, "wb")
+    with buffer:
+        while chunk := await file.read(UPLOAD_READ_CHUNK_BYTES):
+            buffer.write(chunk)
+    return path
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def iter_roster_batches(path: str, role: str, batch_size: int = ROSTER_BATCH_SIZE):
+    """
+    Yield (columns, records) batches from an .xlsx or .csv roster without loading it whole.
+
+    Headers are lower-cased and stripped, every value is returned as text and blank rows
+    are skipped. Raises ValueError when a required column is missing.
+    """
+    workbook = None
+    csv_file = None
+    try:
+        if path.lower().endswith(".csv"):
+            csv_file = open(path, newline="", encoding="utf-8-sig")
+            rows = csv.reader(csv_file)
+        else:
+            workbook = load_workbook(path, read_only=True, data_only=True)
+            rows = workbook.active.iter_rows(values_only=True)
+
+        header = next(rows, None) or []
+        columns = [_cell_text(col).lower() for col in header]
+        missing = [col for col in ROSTER_COLUMNS[role] if col not in columns]
+        if missing:
+            quoted = [f"'{col}'" for col in ROSTER_COLUMNS[role]]
+            required = " and ".join(quoted) if len(quoted) == 2 else ", ".join(quoted[:-1]) + ", and " + quoted[-1]
+            raise ValueError(f"Excel must have {required} columns.")
+
+        batch = []
+        for row in rows:
+            values = [_cell_text(value) for value in row]
+            if not any(values):
+                continue
+            batch.append(dict(zip(columns, values)))
+            if len(batch) >= batch_size:
+                yield columns, batch
+                batch = []
+        if batch:
+            yield columns, batch
+    finally:
+        if workbook is not None:
+            workbook.close()
+        if csv_file is not None:
+            csv_file.close()
+
+async def aiter_roster_batches(path: str, role: str, batch_size: int = ROSTER_BATCH_SIZE):
+    """Async wrapper that parses each batch on a worker thread."""
+    batches = iter_roster_batches(path, role, batch_size)
+    while True:
+        batch = await asyncio.to_thread(next, batches, None)
+        if batch is None:
+            return
+        yield batch
+
+def count_roster_rows(path: str):
+    """Cheap row-count estimate used for job progress (excludes the header)."""
+    if path.lower().endswith(".csv"):
+        with open(path, "rb") as f:
+            return max(sum(1 for _ in f) - 1, 0)
+    workbook = load_workbook(path, read_only=True)
+    try:
+        max_row = workbook.active.max_row
+    finally:
+        workbook.close()
+    return max(max_row - 1, 0) if max_row else None
+
+class RosterResultWriter:
+    """Write-only workbook that appends result rows to a temp file as they are produced."""
+
+    def __init__(self):
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.columns = None
+
+    def append(self, columns: List[str], records: List[dict], passwords: List[str], statuses: List[str]):
+        if self.columns is None:
+            self.columns = [col for col in columns if col not in ("password", "status")]
+            self.sheet.append(self.columns + ["password", "status"])
+        for record, password, row_status in zip(records, passwords, statuses):
+            self.sheet.append([record.get(col, "") for col in self.columns] + [password, row_status])
+
+    def save(self):
+        if self.columns is None:
+            self.sheet.append(["password", "status"])
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        self.workbook.save(path)
+        return path
+
+def workbook_response(path: str, filename: str, headers: Optional[dict] = None):
+    """Stream a generated workbook from disk and delete it once sent."""
+    return FileResponse(
+        path,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=filename,
+        headers=headers,
+        background=BackgroundTask(os.remove, path)
+    )
+
+async def run_roster_upload(file: UploadFile, college_db, college_id: str, role: str, filename: str):
+    """Import an uploaded roster batch by batch and return the results workbook."""
+    started = time.perf_counter()
+    path = await spool_upload(file)
+    writer = RosterResultWriter()
+    total_rows = 0
+    created_count = 0
+    try:
+        async for columns, records in aiter_roster_batches(path, role):
+            passwords, statuses, stats = await bulk_register_users(
+                college_db, college_id, role, [roster_row(role, record) for record in records], bump_meta=False
+            )
+            await asyncio.to_thread(writer.append, columns, records, passwords, statuses)
+            total_rows += stats["rows"]
+            created_count += stats["created"]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(path)
+
+    if created_count > 0:
+        await update_college_meta(college_db, "student" if role == "Student" else "alumni", created_count)
+
+    output_path = await asyncio.to_thread(writer.save)
+    elapsed = time.perf_counter() - started
+    rows_per_second = round(total_rows / elapsed, 1) if elapsed > 0 else float(total_rows)
+    return workbook_response(output_path, filename, {"X-Rows-Per-Second": str(rows_per_second)})
+
 @app.post("/bulk-register-students/")
 async def bulk_register_students(
     file: UploadFile = File(...),
@@ -1449,185 +4717,459 @@ async def bulk_register_students(
     if current_user["role"] != "Admin":
         raise HTTPException(status_code=403, detail="Only college admins can bulk register students.")
     
-    SaaS_Management = client["SaaS_Management"]
     college_id = current_user["collegeId"]
-    college = await SaaS_Management.colleges.find_one({"collegeId": college_id})
+    college = await tenant_registry.get(college_id)
     
     if not college or college.get("status") != "approved":
         raise HTTPException(status_code=403, detail="College account is not approved yet")
     college_db = current_user["collegeDb"]
-    
-    # Read the uploaded Excel file into a pandas DataFrame
-    contents = await file.read()
-    df = pd.read_excel(io.BytesIO(contents))
 
-    # Normalize column names
-    df.columns = [col.strip().lower() for col in df.columns]
+    return await run_roster_upload(file, college_db, college_id, "Student", "students_with_passwords.xlsx")
+
+# Roster listings: documents are encoded straight off the Mongo cursor, with no per-document models
+ROSTER_LIST_FIELDS = {
+    "Student": ["name", "email", "department", "status", "rollno", "lastSeen"],
+    "Alumni": ["name", "email", "department", "status", "prn", "gradYear", "currentRole", "lastSeen"],
+}
+ROSTER_LIST_ALLOWED_FIELDS = {"Student": set(StudentSchema.model_fields), "Alumni": set(AlumniSchema.model_fields)}
+ROSTER_LIST_MAX_LIMIT = int(os.getenv("ROSTER_LIST_MAX_LIMIT", "10000"))
+ROSTER_LIST_BATCH_SIZE = int(os.getenv("ROSTER_LIST_BATCH_SIZE", "1000"))
+ROSTER_LIST_MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+async def encode_documents(cursor, fields: List[str], output: str = "json"):
+    """Yield a JSON array (or NDJSON lines) of `fields` from each document, ROSTER_LIST_BATCH_SIZE per chunk."""
+    dumps = json.JSONEncoder(default=_json_default, separators=(",", ":"), ensure_ascii=False).encode
+    array = output == "json"
+    opening = "[" if array else ""
+    chunk = []
+    async for doc in cursor:
+        chunk.append(dumps({"_id": str(doc["_id"]), **{field: doc.get(field) for field in fields}}))
+        if len(chunk) == ROSTER_LIST_BATCH_SIZE:
+            yield (opening + ",".join(chunk) if array else "\n".join(chunk) + "\n").encode()
+            opening = "," if array else ""
+            chunk = []
+    if array:
+        yield ((opening + ",".join(chunk) if chunk else opening.strip(",")) + "]").encode()
+    elif chunk:
+        yield ("\n".join(chunk) + "\n").encode()
+
+async def list_roster(current_user: dict, role: str, output: str, fields: Optional[str], cursor: Optional[str], limit: Optional[int]):
+    """
+    Stream a role collection in _id order. Without `limit` the whole collection is streamed; with it,
+    one keyset page is, and X-Next-Cursor (known up front from a covered index probe) points past it.
+    """
+    collection = current_user["collegeDb"][role]
+    selected = directory_fields(fields, ROSTER_LIST_FIELDS[role], ROSTER_LIST_ALLOWED_FIELDS[role])
+    query = keyset_filter(["_id"], decode_cursor(cursor, 1), 1) if cursor else {}
+    headers = {}
+    if limit is not None:
+        limit = max(1, min(limit, ROSTER_LIST_MAX_LIMIT))
+        boundary = await collection.find(query, {"_id": 1}).sort("_id", 1).skip(limit - 1).limit(1).to_list(length=1)
+        if boundary:
+            headers["X-Next-Cursor"] = encode_cursor([boundary[0]["_id"]])
+            query = {"_id": {**query.get("_id", {}), "$lte": boundary[0]["_id"]}}
+    documents = collection.find(query, {field: 1 for field in selected}).sort("_id", 1).batch_size(ROSTER_LIST_BATCH_SIZE)
+    if limit is not None:
+        documents = documents.limit(limit)
+    return StreamingResponse(encode_documents(documents, selected, output), media_type=ROSTER_LIST_MEDIA_TYPES[output], headers=headers)
+
+@app.get("/students/")
+async def get_all_students(
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get students from the college's database, streamed as a JSON array or NDJSON (`format`).
 
-    # Check for required columns
-    if not {'rollno', 'email'}.issubset(df.columns):
-        raise HTTPException(status_code=400, detail="Excel must have 'rollno' and 'email' columns.")
+    `fields` is a comma-separated StudentSchema field list; `limit` switches to keyset pages
+    (pass X-Next-Cursor back as `cursor`).
+    """
+    if (current_user["role"] != "Admin"):
+         raise HTTPException(status_code=403, detail="Only college admins can get students data.")
+    return await list_roster(current_user, "Student", output, fields, cursor, limit)
 
-    # Prepare results for Excel output
-    passwords = []
-    statuses = []
-    
-    # Track number of successfully created students
-    created_count = 0
+@app.post("/bulk-register-alumni/")
+async def bulk_register_alumni(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user),
+    _: str = Depends(verify_csrf)
+):
+    # Only allow Admins
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Only college admins can bulk register alumni.")
+    college_id = current_user["collegeId"]
+    college = await tenant_registry.get(college_id)
+    if not college or college.get("status") != "approved":
+        raise HTTPException(status_code=403, detail="College account is not approved yet")
+    college_db = current_user["collegeDb"]
+
+    return await run_roster_upload(file, college_db, college_id, "Alumni", "alumni_with_passwords.xlsx")
+
+from fastapi import UploadFile, File, Form
+import os
+from uuid import uuid4
+
+# Background bulk import jobs
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+IMPORT_JOBS_PER_COLLEGE = int(os.getenv("IMPORT_JOBS_PER_COLLEGE", "1"))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_RESULT_TTL_SECONDS = int(os.getenv("IMPORT_RESULT_TTL_SECONDS", str(24 * 60 * 60)))
+IMPORT_LEASE_SECONDS = int(os.getenv("IMPORT_LEASE_SECONDS", "300"))  # renewed between chunks
+IMPORT_POLL_SECONDS = int(os.getenv("IMPORT_POLL_SECONDS", "30"))
+
+class ImportLeaseLost(Exception):
+    """This worker's lease on an import job expired and another worker has claimed the job."""
 
-    for idx, row in df.iterrows():
-        rollno = str(row['rollno']).strip()
-        email = str(row['email']).strip().lower()
-        password = str(random.randint(100000, 999999))
+def discard_import_upload(file_path: str):
+    """Remove a job's spooled roster; it holds names and emails, so it never outlives the job."""
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
 
-        # Check if student already exists
-        existing = await college_db["Student"].find_one({"email": email})
-        if existing:
-            passwords.append("")
-            statuses.append("Already Exists")
+async def process_import_job(job: dict, renew_lease):
+    """
+    Import a claimed roster job chunk by chunk, checkpointing progress and results in Mongo.
+    `renew_lease` is awaited before every chunk and raises ImportLeaseLost once the job is lost.
+    """
+    jobs = client["SaaS_Management"].import_jobs
+    job_id = job["_id"]
+    owned = {"_id": job_id, "owner": WORKER_ID}
+
+    college = await tenant_registry.get(job["collegeId"])
+    if not college:
+        raise ValueError("College not found")
+    college_db = client[college["databaseName"]]
+    role = job["role"]
+
+    processed = job.get("processedRows", 0)
+    created = job.get("createdRows", 0)
+    elapsed = job.get("elapsedSeconds", 0.0)
+    estimated_total = await asyncio.to_thread(count_roster_rows, job["filePath"])
+    await jobs.update_one(
+        owned,
+        {"$set": {"totalRows": estimated_total, "startedAt": job.get("startedAt") or get_current_time()}}
+    )
+
+    # Resume from the last checkpoint; chunks already recorded are not re-imported
+    offset = 0
+    async for columns, chunk in aiter_roster_batches(job["filePath"], role, IMPORT_CHUNK_SIZE):
+        chunk_offset, offset = offset, offset + len(chunk)
+        if offset <= processed:
             continue
+        await renew_lease()
+
+        results = college_db["import_job_results"]
+        result_key = {"jobId": job_id, "offset": chunk_offset}
+        previous = await results.find_one(result_key, {"pendingPasswords": 1}) or {}
+
+        async def save_passwords(generated: dict):
+            # Written before the insert, so a crash after it commits cannot lose the plaintext
+            await results.update_one(
+                result_key,
+                {"$set": {f"pendingPasswords.{idx}": password for idx, password in generated.items()},
+                 "$setOnInsert": {"createdAt": get_current_time()}},
+                upsert=True
+            )
+
+        rows = [roster_row(role, record) for record in chunk]
+        passwords, statuses, stats = await bulk_register_users(
+            college_db, job["collegeId"], role, rows, on_passwords=save_passwords
+        )
+        # Rows a crashed earlier attempt inserted now read as existing; recover their
+        # credentials when the stored account still matches the saved password
+        for idx, password in (previous.get("pendingPasswords") or {}).items():
+            idx = int(idx)
+            if statuses[idx] != "Already Exists":
+                continue
+            user = await college_db[role].find_one({"email": str(rows[idx]["email"]).strip().lower()}, {"password": 1})
+            if user and await password_hasher.verify(password, user["password"], shed=False):
+                passwords[idx] = password
+                statuses[idx] = "Created"
+                stats["created"] += 1
+        await results.update_one(
+            result_key,
+            {"$set": {
+                "columns": columns,
+                "rows": chunk,
+                "passwords": passwords,
+                "statuses": statuses,
+                "createdAt": get_current_time()
+            }, "$unset": {"pendingPasswords": ""}},
+            upsert=True
+        )
 
-        # Prepare student dict
-        student_obj = StudentSchema(
-            name=rollno,
-            email=email,
-            role="Student",
-            collegeId=college_id,
-            rollno=rollno,
-            status="offline",
-            lastSeen=None,
-            createdAt=get_current_time()
+        processed = offset
+        created += stats["created"]
+        elapsed += stats["seconds"]
+        await jobs.update_one(
+            owned,
+            {"$set": {
+                "processedRows": processed,
+                "createdRows": created,
+                "elapsedSeconds": elapsed,
+                "rowsPerSecond": round(processed / elapsed, 1) if elapsed > 0 else None,
+            }}
         )
-        student_dict = student_obj.dict()
-        student_dict["password"] = get_password_hash(password)
-        await college_db["Student"].insert_one(student_dict)
-        passwords.append(password)
-        statuses.append("Created")
-        created_count += 1
-
-    # Add password and status columns to DataFrame
-    df['password'] = passwords
-    df['status'] = statuses
-    
-    # Update meta collection with the count of newly created students
-    if created_count > 0:
-        await update_college_meta(college_db, "student", created_count)
-
-    # Write the DataFrame to an Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-
-    # Return the file as a response
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=students_with_passwords.xlsx"}
+
+    completed = await jobs.update_one(
+        owned,
+        {"$set": {"status": "completed", "totalRows": processed, "finishedAt": get_current_time()},
+         "$unset": {"leaseExpiresAt": ""}}
     )
+    if not completed.matched_count:
+        raise ImportLeaseLost(f"Import job {job_id} was claimed by another worker")
+    discard_import_upload(job["filePath"])
 
-@app.get("/students/", response_model=List[StudentSchema])
-async def get_all_students(current_user: User = Depends(get_current_user)):
+class ImportJobRunner:
     """
-    Get all students from the college's database.
-    Returns:
-        List[StudentSchema]: List of all student documents
+    Runs bulk import jobs in the background with per-worker and per-college concurrency limits.
+
+    Every API worker polls for queued jobs and for running jobs whose owner let the lease lapse
+    (crashed or restarted). A job runs only on the worker whose atomic claim wins, and while it
+    runs it holds one of its college's IMPORT_JOBS_PER_COLLEGE slot leases in
+    SaaS_Management.locks, so the tenant limit holds across all workers.
     """
-    if (current_user["role"] != "Admin"):
-         raise HTTPException(status_code=403, detail="Only college admins can get students data.")
-    college_db = current_user["collegeDb"]
-    students = []
-    projection = {"_id": 1, "name": 1, "email": 1,"department":1,"status":1,"rollno":1,"lastSeen":1}
-    async for student in college_db.Student.find({},projection):
 
-        students.append(StudentSchema(**student))
-    return students
+    def __init__(self, workers: int = IMPORT_WORKERS, per_college: int = IMPORT_JOBS_PER_COLLEGE):
+        self.workers = workers
+        self.per_college = per_college
+        self._worker_slots = asyncio.Semaphore(workers)
+        self._college_slots: dict = {}
+        self._tasks: dict = {}
+        self._poller = None
+        self.claimed = 0
+        self.lost = 0
+
+    def start(self):
+        self._poller = asyncio.create_task(self._poll_loop())
+
+    def stop(self):
+        if self._poller:
+            self._poller.cancel()
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await self.resume_pending()
+            except Exception as e:
+                print(f"Import job poll failed: {e}")
+            await asyncio.sleep(IMPORT_POLL_SECONDS)
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return {"$or": [
+            {"status": "queued"},
+            {"status": "running", "leaseExpiresAt": {"$lt": now}},
+            {"status": "running", "leaseExpiresAt": {"$exists": False}}
+        ]}
+
+    async def _acquire_slot(self, college_id: str):
+        """One of the college's slot leases, or None when every slot is held by a live job."""
+        now = get_current_time()
+        for slot in range(self.per_college):
+            slot_id = f"import:{college_id}:{slot}"
+            try:
+                await client["SaaS_Management"].locks.update_one(
+                    {"_id": slot_id, "expiresAt": {"$lt": now}},
+                    {"$set": {"owner": WORKER_ID, "expiresAt": now + timedelta(seconds=IMPORT_LEASE_SECONDS)}},
+                    upsert=True
+                )
+                return slot_id
+            except DuplicateKeyError:
+                continue
+        return None
+
+    async def _release_slot(self, slot_id: str):
+        await client["SaaS_Management"].locks.delete_one({"_id": slot_id, "owner": WORKER_ID})
+
+    async def _claim(self, job_id: ObjectId):
+        """Atomically move a queued or abandoned job to running under this worker; None if someone else has it."""
+        now = get_current_time()
+        return await client["SaaS_Management"].import_jobs.find_one_and_update(
+            {"_id": job_id, **self._claimable(now)},
+            {"$set": {"status": "running", "owner": WORKER_ID,
+                      "leaseExpiresAt": now + timedelta(seconds=IMPORT_LEASE_SECONDS)}},
+            return_document=ReturnDocument.AFTER
+        )
 
-@app.post("/bulk-register-alumni/")
-async def bulk_register_alumni(
+    async def _renew(self, job_id: ObjectId, slot_id: str):
+        expires = get_current_time() + timedelta(seconds=IMPORT_LEASE_SECONDS)
+        renewed = await client["SaaS_Management"].import_jobs.update_one(
+            {"_id": job_id, "owner": WORKER_ID, "status": "running"}, {"$set": {"leaseExpiresAt": expires}}
+        )
+        if not renewed.matched_count:
+            raise ImportLeaseLost(f"Import job {job_id} was claimed by another worker")
+        await client["SaaS_Management"].locks.update_one(
+            {"_id": slot_id, "owner": WORKER_ID}, {"$set": {"expiresAt": expires}}
+        )
+
+    def submit(self, job_id: ObjectId, college_id: str):
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(job_id, college_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: ObjectId, college_id: str):
+        # Take the college slot first so a queued job never holds a shared worker
+        college_slots = self._college_slots.setdefault(college_id, asyncio.Semaphore(self.per_college))
+        async with college_slots:
+            async with self._worker_slots:
+                # Without a free slot the job stays queued and a later poll retries it
+                slot_id = await self._acquire_slot(college_id)
+                if slot_id is None:
+                    return
+                try:
+                    job = await self._claim(job_id)
+                    if job is None:
+                        return
+                    self.claimed += 1
+                    await process_import_job(job, lambda: self._renew(job_id, slot_id))
+                except ImportLeaseLost as e:
+                    self.lost += 1
+                    print(e)
+                except Exception as e:
+                    print(f"Import job {job_id} failed: {e}")
+                    failed = await client["SaaS_Management"].import_jobs.find_one_and_update(
+                        {"_id": job_id, "owner": WORKER_ID},
+                        {"$set": {"status": "failed", "error": str(e), "finishedAt": get_current_time()},
+                         "$unset": {"leaseExpiresAt": ""}}
+                    )
+                    if failed:
+                        discard_import_upload(failed["filePath"])
+                finally:
+                    await self._release_slot(slot_id)
+
+    async def resume_pending(self):
+        async for job in client["SaaS_Management"].import_jobs.find(
+            self._claimable(get_current_time()), {"collegeId": 1}
+        ):
+            self.submit(job["_id"], job["collegeId"])
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "per_college": self.per_college,
+            "active_jobs": len(self._tasks),
+            "claimed": self.claimed,
+            "lost_leases": self.lost,
+        }
+
+import_job_runner = ImportJobRunner()
+
+@app.on_event("startup")
+async def resume_import_jobs():
+    import_job_runner.start()
+
+@app.on_event("shutdown")
+async def stop_import_jobs():
+    import_job_runner.stop()
+
+async def get_import_job(job_id: str, current_user: dict):
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Only college admins can view import jobs.")
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID format")
+    job = await client["SaaS_Management"].import_jobs.find_one({
+        "_id": ObjectId(job_id),
+        "collegeId": current_user["collegeId"]
+    })
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/jobs/bulk-register")
+async def create_bulk_register_job(
+    role: str = Form(...),
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user),
     _: str = Depends(verify_csrf)
 ):
-    # Only allow Admins
     if current_user["role"] != "Admin":
-        raise HTTPException(status_code=403, detail="Only college admins can bulk register alumni.")
-    SaaS_Management = client["SaaS_Management"]
+        raise HTTPException(status_code=403, detail="Only college admins can bulk register users.")
+    if role not in ROSTER_COLUMNS:
+        raise HTTPException(status_code=400, detail="Role must be Student or Alumni")
+
     college_id = current_user["collegeId"]
-    college = await SaaS_Management.colleges.find_one({"collegeId": college_id})
+    college = await tenant_registry.get(college_id)
     if not college or college.get("status") != "approved":
         raise HTTPException(status_code=403, detail="College account is not approved yet")
-    college_db = current_user["collegeDb"]
-    
-    # Read the uploaded Excel file into a pandas DataFrame
-    contents = await file.read()
-    df = pd.read_excel(io.BytesIO(contents))
-
-    # Normalize column names
-    df.columns = [col.strip().lower() for col in df.columns]
-
-    # Check for required columns
-    if not {'name', 'prn', 'email'}.issubset(df.columns):
-        raise HTTPException(status_code=400, detail="Excel must have 'name', 'prn', and 'email' columns.")
-
-    # Prepare results for Excel output
-    passwords = []
-    statuses = []
-
-    for idx, row in df.iterrows():
-        name = str(row['name']).strip()
-        prn = str(row['prn']).strip()
-        email = str(row['email']).strip().lower()
-        password = str(random.randint(100000, 999999))
-
-        # Check if alumni already exists
-        existing = await college_db["Alumni"].find_one({"email": email})
-        if existing:
-            passwords.append("")
-            statuses.append("Already Exists")
-            continue
 
-        # Prepare alumni dict
-        alumni_obj = AlumniSchema(
-            name=name,
-            email=email,
-            role="Alumni",
-            collegeId=college_id,
-            prn=prn,
-            status="offline",
-            lastSeen=None,
-            createdAt=get_current_time()
-        )
-        alumni_dict = alumni_obj.dict()
-        alumni_dict["password"] = get_password_hash(password)
-        await college_db["Alumni"].insert_one(alumni_dict)
-        passwords.append(password)
-        statuses.append("Created")
-        created_count += 1
+    # Keep the upload on disk so the job can resume after a restart
+    job_id = ObjectId()
+    uploads_dir = os.path.join("data", str(college_id).replace(" ", "_"), "imports")
+    os.makedirs(uploads_dir, exist_ok=True)
+    file_path = os.path.join(uploads_dir, f"{job_id}{roster_extension(file.filename)}")
+    await spool_upload(file, file_path)
 
-    # Add password and status columns to DataFrame
-    df['password'] = passwords
-    df['status'] = statuses
+    college_db = current_user["collegeDb"]
+    await college_db["import_job_results"].create_index([("jobId", 1), ("offset", 1)], unique=True)
+    await college_db["import_job_results"].create_index("createdAt", expireAfterSeconds=IMPORT_RESULT_TTL_SECONDS)
+
+    await client["SaaS_Management"].import_jobs.insert_one({
+        "_id": job_id,
+        "collegeId": college_id,
+        "role": role,
+        "filename": file.filename,
+        "filePath": file_path,
+        "status": "queued",
+        "processedRows": 0,
+        "createdRows": 0,
+        "elapsedSeconds": 0.0,
+        "createdBy": current_user["_id"],
+        "createdAt": get_current_time()
+    })
+    import_job_runner.submit(job_id, college_id)
+    return {"status": "queued", "jobId": str(job_id)}
 
-    if created_count > 0:
-        await update_college_meta(college_db, "student", created_count)
-
-    # Write the DataFrame to an Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-
-    # Return the file as a response
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=alumni_with_passwords.xlsx"}
-    )
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = await get_import_job(job_id, current_user)
+    total = job.get("totalRows")
+    return {
+        "jobId": str(job["_id"]),
+        "role": job["role"],
+        "filename": job.get("filename"),
+        "status": job["status"],
+        "totalRows": total,
+        "processedRows": job.get("processedRows", 0),
+        "createdRows": job.get("createdRows", 0),
+        "progress": round(job.get("processedRows", 0) / total * 100, 1) if total else 0,
+        "rowsPerSecond": job.get("rowsPerSecond"),
+        "error": job.get("error"),
+        "createdAt": job.get("createdAt"),
+        "finishedAt": job.get("finishedAt")
+    }
 
-from fastapi import UploadFile, File, Form
-import os
-from uuid import uuid4
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = await get_import_job(job_id, current_user)
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    college_db = current_user["collegeDb"]
+    writer = RosterResultWriter()
+    found = False
+    async for doc in college_db["import_job_results"].find({"jobId": job["_id"]}).sort("offset", 1):
+        found = True
+        await asyncio.to_thread(writer.append, doc["columns"], doc["rows"], doc["passwords"], doc["statuses"])
+    if not found and job.get("totalRows"):
+        raise HTTPException(status_code=410, detail="Job results have expired")
+
+    output_path = await asyncio.to_thread(writer.save)
+    filename = "students_with_passwords.xlsx" if job["role"] == "Student" else "alumni_with_passwords.xlsx"
+    return workbook_response(output_path, filename)
 
 @app.post("/achievements/")
 async def create_achievement(
@@ -1695,21 +5237,23 @@ async def get_college_stats(current_user: dict = Depends(get_current_user), _: s
     
     return meta
 
-@app.get("/alumni/", response_model=List[AlumniSchema])
-async def get_all_alumni(current_user: User = Depends(get_current_user)):
+@app.get("/alumni/")
+async def get_all_alumni(
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
     """
-    Get all alumni from the college's database.
-    Returns:
-        List[AlumniSchema]: List of all alumni documents
+    Get alumni from the college's database, streamed as a JSON array or NDJSON (`format`).
+
+    `fields` is a comma-separated AlumniSchema field list; `limit` switches to keyset pages
+    (pass X-Next-Cursor back as `cursor`).
     """
     if (current_user["role"] != "Admin"):
          raise HTTPException(status_code=403, detail="Only college admins can get alumni data.")
-    college_db = current_user["collegeDb"]
-    alumni = []
-    projection = {"_id": 1, "name": 1, "email": 1, "department": 1, "status": 1, "prn": 1, "gradYear": 1, "currentRole": 1, "lastSeen": 1}
-    async for alum in college_db.Alumni.find({}, projection):
-        alumni.append(AlumniSchema(**alum))
-    return alumni
+    return await list_roster(current_user, "Alumni", output, fields, cursor, limit)
 
 @app.post("/add-student/")
 async def add_student(
@@ -1738,9 +5282,13 @@ async def add_student(
     student_dict["collegeId"] = college_id
     student_dict["status"] = "offline"
     student_dict["createdAt"] = get_current_time()
-    student_dict["password"] = get_password_hash(password)
+    student_dict["password"] = await password_hasher.hash(password)
     
     result = await college_db["Student"].insert_one(student_dict)
+    await user_roles.add(college_db, college_id, [result.inserted_id], "Student")
+    directory_index.patch(college_id, "Student", {**student_dict, "_id": result.inserted_id})
+    mentor_index.patch(college_id, "Student", {**student_dict, "_id": result.inserted_id})
+    typeahead_index.patch(college_id, "Student", {**student_dict, "_id": result.inserted_id})
     
     # Update meta collection
     await update_college_meta(college_db, "student", 1)
@@ -1782,9 +5330,13 @@ async def add_alumni(
     alumni_dict["collegeId"] = college_id
     alumni_dict["status"] = "offline"
     alumni_dict["createdAt"] = get_current_time()
-    alumni_dict["password"] = get_password_hash(password)
+    alumni_dict["password"] = await password_hasher.hash(password)
     
     result = await college_db["Alumni"].insert_one(alumni_dict)
+    await user_roles.add(college_db, college_id, [result.inserted_id], "Alumni")
+    directory_index.patch(college_id, "Alumni", {**alumni_dict, "_id": result.inserted_id})
+    mentor_index.patch(college_id, "Alumni", {**alumni_dict, "_id": result.inserted_id})
+    typeahead_index.patch(college_id, "Alumni", {**alumni_dict, "_id": result.inserted_id})
     
     # Update meta collection
     await update_college_meta(college_db, "alumni", 1)
@@ -0,0 +1,126 @@
+"""
+Benchmark for the /students/ listing path.
+
+Compares the old response_model path (a StudentSchema per document, then FastAPI's
+re-validation and serialization of the whole list) with the streamed encoder used now,
+and times keyset pages across the collection. Runs against the MongoDB in MONGODB_URL
+using a throwaway database.
+
+    cd backend && python -m benchmarks.directory_listing --documents 100000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import TypeAdapter
+
+from app import (ROSTER_LIST_FIELDS, StudentSchema, encode_documents, get_current_time,
+                 keyset_filter)
+
+FIELDS = ROSTER_LIST_FIELDS["Student"]
+PROJECTION = {field: 1 for field in FIELDS}
+
+
+def new_student(i):
+    return {
+        "name": f"student {i:06d}",
+        "email": f"student{i}@bench.edu",
+        "role": "Student",
+        "department": ["CSE", "ECE", "ME", "CE"][i % 4],
+        "status": "offline",
+        "rollno": f"R{i:06d}",
+        "lastSeen": get_current_time(),
+        "skills": ["python", "sql"],
+        "password": "x" * 60,
+    }
+
+
+async def model_path(collection):
+    """What `response_model=List[StudentSchema]` did: build, dump, re-validate, serialize."""
+    # role is projected too: without it the schema default fails re-validation
+    started = time.perf_counter()
+    students = [StudentSchema(**doc) async for doc in collection.find({}, {**PROJECTION, "role": 1})]
+    adapter = TypeAdapter(List[StudentSchema])
+    body = adapter.dump_json(adapter.validate_python([student.model_dump() for student in students]))
+    return len(body), None, time.perf_counter() - started
+
+
+async def streamed_path(collection):
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    async for chunk in encode_documents(collection.find({}, PROJECTION).sort("_id", 1), FIELDS):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    return size, first_byte, time.perf_counter() - started
+
+
+async def measure(path, collection):
+    size, first_byte, elapsed = await path(collection)
+    tracemalloc.start()
+    await path(collection)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "total_ms": round(elapsed * 1000, 1),
+        "first_byte_ms": round((elapsed if first_byte is None else first_byte) * 1000, 1),
+        "peak_mb": round(peak / 2**20, 1),
+        "bytes": size,
+    }
+
+
+async def page_through(collection, limit):
+    latencies = []
+    query = {}
+    while True:
+        t0 = time.perf_counter()
+        page = await collection.find(query, PROJECTION).sort("_id", 1).limit(limit).to_list(length=limit)
+        async for _ in encode_documents(_aiter(page), FIELDS):
+            pass
+        latencies.append(time.perf_counter() - t0)
+        if len(page) < limit:
+            break
+        query = keyset_filter(["_id"], [page[-1]["_id"]], 1)
+    return {
+        "pages": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "last_page_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    mongo = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    db_name = f"bench_directory_listing_{ObjectId()}"
+    collection = mongo[db_name]["Student"]
+    try:
+        for start in range(0, args.documents, 5000):
+            await collection.insert_many([new_student(i) for i in range(start, min(start + 5000, args.documents))])
+        for name, path in (("response_model", model_path), ("streamed", streamed_path)):
+            print(f"{name:15} {await measure(path, collection)}")
+        print(f"{'keyset pages':15} {await page_through(collection, args.page_size)}")
+    finally:
+        await mongo.drop_database(db_name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark for the WebSocket message write path.
+
+Compares the old insert_one + find_one round trip with the current path that builds
+the outgoing payload from the in-memory document. Runs against the MongoDB in
+MONGODB_URL using a throwaway database.
+
+    cd backend && python -m benchmarks.message_write --messages 2000 --rate 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app import IST, get_current_time, websocket_message_payload
+
+
+def new_message(sender_id, receiver_id, i):
+    return {
+        "content": f"benchmark message {i}",
+        "senderId": sender_id,
+        "receiverId": receiver_id,
+        "timestamp": get_current_time(),
+        "isRead": False
+    }
+
+
+async def reread_path(collection, message):
+    result = await collection.insert_one(message)
+    new_message = await collection.find_one({"_id": result.inserted_id})
+    return json.dumps({"type": "message", "data": {
+        "_id": str(new_message["_id"]),
+        "content": new_message["content"],
+        "senderId": str(new_message["senderId"]),
+        "receiverId": str(new_message["receiverId"]),
+        "timestamp": new_message["timestamp"].astimezone(IST).isoformat(),
+        "isRead": new_message["isRead"]
+    }})
+
+
+async def in_memory_path(collection, message):
+    await collection.insert_one(message)
+    return json.dumps({"type": "message", "data": websocket_message_payload(message)})
+
+
+async def run(path, collection, messages, rate):
+    sender_id, receiver_id = ObjectId(), ObjectId()
+    interval = 1 / rate if rate else 0
+    latencies = []
+    started = time.perf_counter()
+    for i in range(messages):
+        t0 = time.perf_counter()
+        await path(collection, new_message(sender_id, receiver_id, i))
+        took = time.perf_counter() - t0
+        latencies.append(took)
+        if interval > took:
+            await asyncio.sleep(interval - took)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "achieved_rate": round(messages / elapsed, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=0, help="target messages/second (0 = unthrottled)")
+    args = parser.parse_args()
+
+    mongo = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    db_name = f"bench_message_write_{ObjectId()}"
+    collection = mongo[db_name]["messages"]
+    try:
+        for name, path, ops in (("insert+reread", reread_path, 2), ("in-memory", in_memory_path, 1)):
+            stats = await run(path, collection, args.messages, args.rate)
+            print(f"{name:14} {stats}  mongo ops/message={ops}")
+        saved = f"{args.messages} find_one calls per run"
+        if args.rate:
+            saved += f", {args.rate:g} per second at the target rate"
+        print(f"Mongo ops saved: {saved}")
+    finally:
+        await mongo.drop_database(db_name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""
+Message search scoping. Runs against the MongoDB in MONGODB_URL using a throwaway database
+(full-text search needs a real server) and is skipped when none is configured.
+
+    cd backend && python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from fastapi import HTTPException, Response
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app import get_current_time, search_messages
+
+pytestmark = pytest.mark.skipif(not os.getenv("MONGODB_URL"), reason="MONGODB_URL is not set")
+
+
+def search_group_as(caller_is_member: bool, q: str):
+    """Seed a two-member group with one message, then search it as a member or an outsider."""
+    async def scenario():
+        mongo = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+        college_db = mongo[f"test_message_search_{ObjectId()}"]
+        try:
+            members = [ObjectId(), ObjectId()]
+            group_id = ObjectId()
+            await college_db.groups.insert_one({"_id": group_id, "name": "g", "members": members})
+            await college_db.messages.insert_one({
+                "content": "exam schedule posted", "senderId": members[0], "groupId": group_id,
+                "timestamp": get_current_time(), "isRead": False
+            })
+            # Shaped like get_current_user's principal: _id stays an ObjectId
+            current_user = {
+                "_id": members[1] if caller_is_member else ObjectId(),
+                "collegeDb": college_db,
+                "collegeId": str(group_id),
+            }
+            return await search_messages(Response(), q=q, group_id=str(group_id), current_user=current_user)
+        finally:
+            await mongo.drop_database(college_db.name)
+    return asyncio.run(scenario())
+
+
+def test_member_can_search_their_group():
+    results = search_group_as(caller_is_member=True, q="exam")
+    assert [message["content"] for message in results] == ["exam schedule posted"]
+
+
+def test_outsider_cannot_search_a_group():
+    with pytest.raises(HTTPException) as refused:
+        search_group_as(caller_is_member=False, q="exam")
+    assert refused.value.status_code == 403
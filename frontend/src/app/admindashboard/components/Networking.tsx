@@ -75,6 +75,11 @@ export default function Networking() {
       
       ws.onmessage = (event) => {
         const receivedData = JSON.parse(event.data);
+        if (receivedData.type === 'ping') {
+          // Answer server heartbeats so the connection isn't reaped as idle
+          ws.send(JSON.stringify({ type: 'pong' }));
+          return;
+        }
         console.log('WebSocket message received:', receivedData);
         
         if (receivedData.type === 'group_message' && chatType === 'group') {